@@ -1,13 +1,73 @@
-from fastapi import FastAPI, Depends, HTTPException
+import time
+_import_started = time.perf_counter()
+
+import hashlib
+import json
+import os
+import threading
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Depends, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
 from sqlalchemy.orm import Session
-from . import models, database
+from . import database, migrations
 from .services.rxnav_service import rxnav_service
 from .services.interaction_service import interaction_service
+from .services.interaction_index import interaction_index
+from .services.interaction_matrix import interaction_matrix
+from .services.rule_store import rule_store
+from .services.local_search import local_search
+from .services.autocomplete import autocomplete_service
+from .services.http_client import http_client
+from .services.check_sessions import check_sessions
+from .services.check_cache import check_cache
+from .services.metrics import metrics
+
+# Fast startup (autoscaled / serverless workers): no schema work at import (run
+# `python -m backend.migrations` once per deploy instead) and in-memory indexes warm up in
+# the background after the server is ready. Until then requests take the lazy paths
+# (SQL lookups, indexes built on first use).
+FAST_STARTUP = os.getenv("FAST_STARTUP", "0") == "1"
+
+startup_timings = {"fast_startup": FAST_STARTUP, "warmup_ms": {}}
+
+if not FAST_STARTUP:
+    started = time.perf_counter()
+    migrations.migrate(database.engine)
+    startup_timings["migrations_ms"] = round((time.perf_counter() - started) * 1000, 1)
+metrics.instrument_engine(database.engine)
+if database.read_engine is not database.engine:
+    metrics.instrument_engine(database.read_engine)
+
+def _timed_step(name: str, func):
+    started = time.perf_counter()
+    result = func()
+    startup_timings["warmup_ms"][name] = round((time.perf_counter() - started) * 1000, 1)
+    return result
 
-models.Base.metadata.create_all(bind=database.engine)
+def warm_up():
+    # Load all interactions into memory so checks don't go through the ORM
+    count = _timed_step("interaction_index", interaction_index.build)
+    print(f"Interaction index loaded: {count} pairs")
+    if _timed_step("interaction_matrix", interaction_matrix.load):
+        print(f"Interaction matrix mapped: {interaction_matrix.stats()}")
+    print(f"Food/condition rules loaded: {_timed_step('rule_store', rule_store.build)}")
+    print(f"Local search index loaded: {_timed_step('local_search', local_search.rebuild)} entries")
+    print(f"Autocomplete trie loaded: {_timed_step('autocomplete', autocomplete_service.build)}")
 
-app = FastAPI(title="Drug Interaction Safety API")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    started = time.perf_counter()
+    if FAST_STARTUP:
+        threading.Thread(target=warm_up, name="warm-up", daemon=True).start()
+    else:
+        warm_up()
+    startup_timings["startup_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    print(f"Started in {startup_timings['startup_ms']} ms (import {startup_timings['import_ms']} ms, "
+          f"fast startup {'on' if FAST_STARTUP else 'off'})")
+    yield
+
+app = FastAPI(title="Drug Interaction Safety API", lifespan=lifespan)
 
 # Enable CORS
 app.add_middleware(
@@ -21,18 +81,72 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing", "ETag"],
 )
 
+@app.middleware("http")
+async def record_timings(request: Request, call_next):
+    # Latency histogram per route; with "X-Timing: 1" the response also carries this
+    # request's per-stage breakdown and upstream/cache/DB counts as a Server-Timing header
+    token = metrics.begin_request()
+    start = time.perf_counter()
+    try:
+        response = await call_next(request)
+    finally:
+        timings = metrics.end_request(token)
+    seconds = time.perf_counter() - start
+    route = request.scope.get("route")
+    metrics.observe_request(request.method, route.path if route else "unmatched", response.status_code, seconds)
+    if request.headers.get("x-timing") == "1":
+        response.headers["Server-Timing"] = timings.server_timing(seconds)
+    return response
+
 @app.get("/")
 def read_root():
     return {"status": "Drug Interaction Safety API is running"}
 
+@app.get("/api/startup")
+def startup_stats():
+    # Import, startup and per-index warm-up times of this worker
+    return startup_timings
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def prometheus_metrics():
+    # Prometheus text exposition format
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/api/interaction_index")
+def interaction_index_stats():
+    return interaction_index.memory_footprint()
+
+@app.get("/api/interaction_matrix")
+def interaction_matrix_stats():
+    return interaction_matrix.stats()
+
+@app.get("/api/interactions/{rxcui}")
+def drug_interactions(rxcui: str, db: Session = Depends(database.get_read_db)):
+    # "All interactions for X": one neighbor-list read, no SQL when the matrix or index is loaded
+    return {"rxcui": rxcui, "interactions": interaction_service.interactions_for(rxcui, db)}
+
+@app.get("/api/upstream")
+def upstream_stats():
+    # Outbound HTTP: per-host retries, breaker state and connection reuse
+    return http_client.metrics()
+
+@app.post("/api/rules/reload")
+def reload_rules():
+    # Pick up re-ingested food/condition rules without a restart
+    return rule_store.build()
+
+@app.get("/api/autocomplete")
+def autocomplete(q: str, limit: int = 10):
+    # Typeahead: in-memory trie only, no DB or network per request
+    return {"query": q, "suggestions": autocomplete_service.suggest(q, limit)}
+
 @app.get("/api/search_drug")
 def search_drug(name: str):
     return rxnav_service.search_drug(name)
 
-from .services.food_interaction_service import food_interaction_service
-from .services.condition_service import condition_interaction_service
 from .services.explanation_service import explanation_service
 from pydantic import BaseModel
 from typing import List, Optional
@@ -41,6 +155,15 @@ class CheckRequest(BaseModel):
     rxcuis: List[str]
     conditions: Optional[List[str]] = []
 
+class BatchCheckItem(CheckRequest):
+    id: Optional[str] = None  # Caller's reference (e.g. prescription id), echoed back
+
+class BatchCheckRequest(BaseModel):
+    checks: List[BatchCheckItem]
+
+class SessionDrugRequest(BaseModel):
+    rxcui: str
+
 class ExplainRequest(BaseModel):
     drug1: str
     drug2: str
@@ -50,29 +173,75 @@ class ExplainRequest(BaseModel):
 def explain_interaction(request: ExplainRequest):
     return explanation_service.explain(request.drug1, request.drug2, request.severity)
 
-@app.post("/api/check_interactions")
-def check_interactions(request: CheckRequest, db: Session = Depends(database.get_db)):
-    rxcuis = request.rxcuis
-    conditions = request.conditions
-    
-    # 1. Check Drug-Drug Interactions
-    drug_interactions_response = interaction_service.check_interactions(rxcuis, db)
-    
-    # 2. Resolve Drug Names for Additional Checks
-    drug_names = []
-    for rxcui in rxcuis:
-        name = rxnav_service.get_name(rxcui)
-        if name:
-            drug_names.append(name)
-            
-    # 3. Check Food Interactions
-    food_interactions = food_interaction_service.check_food_interactions(drug_names)
-    
-    # 4. Check Health Condition Interactions
-    condition_interactions = condition_interaction_service.check_condition_interactions(drug_names, conditions)
-    
-    # Merge responses
-    response = drug_interactions_response
-    response["food_interactions"] = food_interactions
-    response["condition_interactions"] = condition_interactions
+def _etag_response(result: dict, http_request: Request) -> Response:
+    # ETag over the body: clients revalidate with If-None-Match and get a bodiless 304
+    response = JSONResponse(result)
+    etag = f'"{hashlib.sha1(response.body).hexdigest()}"'
+    if etag in http_request.headers.get("if-none-match", ""):
+        return Response(status_code=304, headers={"ETag": etag})
+    response.headers["ETag"] = etag
     return response
+
+@app.post("/api/check_interactions")
+async def check_interactions(request: CheckRequest, http_request: Request):
+    # Async pipeline: local lookups, name resolution and the OpenFDA fan-out overlap,
+    # and the event loop keeps serving other checks while upstreams respond.
+    # Repeat medication sets are assembled from check_cache without any upstream call.
+    with metrics.stage("check.total"):
+        result = await interaction_service.check_cached_async(request.rxcuis, request.conditions)
+    return _etag_response(result, http_request)
+
+@app.get("/api/check_cache")
+def check_cache_stats():
+    return check_cache.stats()
+
+@app.post("/api/check_interactions/batch")
+def check_interactions_batch(request: BatchCheckRequest):
+    # Resolve every unique drug and pair in the batch once, then stream one NDJSON line per list
+    db = database.ReadSessionLocal()
+    try:
+        summary, results = interaction_service.check_batch(
+            [(check.rxcuis, check.conditions) for check in request.checks], db
+        )
+    finally:
+        db.close()
+
+    def lines():
+        for index, (check, result) in enumerate(zip(request.checks, results)):
+            yield json.dumps({"index": index, "id": check.id, **result}, ensure_ascii=False) + "\n"
+
+    headers = {f"X-Batch-{key.replace('_', '-').title()}": str(value) for key, value in summary.items()}
+    return StreamingResponse(lines(), media_type="application/x-ndjson", headers=headers)
+
+# Incremental checks: the server keeps each list's evaluated pairs, so a change only
+# evaluates the pairs (and food/condition rules) of the drugs that are new
+
+async def _session_response(change, http_request: Request) -> Response:
+    with metrics.stage("check.total"):
+        result = await change
+    if result is None:
+        raise HTTPException(status_code=404, detail="Check session not found or expired")
+    return _etag_response(result, http_request)
+
+@app.post("/api/check_sessions")
+async def create_check_session(request: CheckRequest, http_request: Request):
+    return await _session_response(check_sessions.create(request.rxcuis, request.conditions), http_request)
+
+@app.put("/api/check_sessions/{session_id}")
+async def update_check_session(session_id: str, request: CheckRequest, http_request: Request):
+    return await _session_response(check_sessions.update(session_id, request.rxcuis, request.conditions), http_request)
+
+@app.post("/api/check_sessions/{session_id}/drugs")
+async def add_session_drug(session_id: str, request: SessionDrugRequest, http_request: Request):
+    return await _session_response(check_sessions.add_drug(session_id, request.rxcui), http_request)
+
+@app.delete("/api/check_sessions/{session_id}/drugs/{rxcui}")
+async def remove_session_drug(session_id: str, rxcui: str, http_request: Request):
+    return await _session_response(check_sessions.remove_drug(session_id, rxcui), http_request)
+
+@app.delete("/api/check_sessions/{session_id}")
+def delete_check_session(session_id: str):
+    check_sessions.delete(session_id)
+    return {"deleted": session_id}
+
+startup_timings["import_ms"] = round((time.perf_counter() - _import_started) * 1000, 1)
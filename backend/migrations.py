@@ -0,0 +1,197 @@
+import time
+from contextlib import contextmanager
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Engine
+from .models import Base, make_pair_key, severity_rank
+
+
+def migrate(engine: Engine):
+    """Create missing tables, then apply the migrations below."""
+    Base.metadata.create_all(bind=engine)
+    run_migrations(engine)
+
+
+def run_migrations(engine: Engine):
+    """
+    Bring an existing database up to the current schema. Idempotent; safe to run on every start.
+    (`create_all` only creates missing tables, it never alters existing ones.)
+    """
+    _add_interaction_pair_key(engine)
+    _create_drug_search_fts(engine)
+    _create_trigram_indexes(engine)
+    _create_data_version_triggers(engine)
+
+
+def _add_interaction_pair_key(engine: Engine):
+    """
+    Add `interactions.pair_key`, backfill it, merge duplicate pairs and enforce uniqueness.
+    For each duplicated pair the row with the highest severity is kept (lowest id on ties).
+    """
+    inspector = inspect(engine)
+    if "interactions" not in inspector.get_table_names():
+        return
+
+    columns = {c["name"] for c in inspector.get_columns("interactions")}
+    indexes = {i["name"] for i in inspector.get_indexes("interactions")}
+    if "pair_key" in columns and "uq_interaction_pair" in indexes:
+        return
+
+    with engine.begin() as conn:
+        if "pair_key" not in columns:
+            conn.execute(text("ALTER TABLE interactions ADD COLUMN pair_key VARCHAR"))
+
+        rows = conn.execute(text(
+            "SELECT id, drug_1_rxcui, drug_2_rxcui, severity FROM interactions ORDER BY id"
+        )).all()
+
+        keep = {}  # pair_key -> (rank, id)
+        keys = []
+        for row_id, d1, d2, severity in rows:
+            key = make_pair_key(d1, d2)
+            keys.append({"id": row_id, "pair_key": key})
+            rank = severity_rank(severity)
+            if key not in keep or rank > keep[key][0]:
+                keep[key] = (rank, row_id)
+
+        kept_ids = {row_id for _, row_id in keep.values()}
+        duplicates = [{"id": row_id} for row_id, *_ in rows if row_id not in kept_ids]
+
+        if duplicates:
+            conn.execute(text("DELETE FROM interactions WHERE id = :id"), duplicates)
+        backfill = [k for k in keys if k["id"] in kept_ids]
+        if backfill:
+            conn.execute(text("UPDATE interactions SET pair_key = :pair_key WHERE id = :id"), backfill)
+
+        conn.execute(text("CREATE UNIQUE INDEX IF NOT EXISTS uq_interaction_pair ON interactions (pair_key)"))
+
+    print(f"Migrated interactions: pair_key backfilled for {len(kept_ids)} rows, "
+          f"{len(duplicates)} duplicate rows merged")
+
+
+def _create_drug_search_fts(engine: Engine):
+    """FTS5 index backing local drug search (SQLite only; populated by local_search.rebuild)."""
+    from .services.local_search import FTS_DDL
+
+    if engine.dialect.name != "sqlite":
+        return
+    with engine.begin() as conn:
+        conn.execute(text(FTS_DDL))
+
+
+# Per-column name indexes from an earlier schema. Local search goes through the single
+# drug_search document index instead, so these only slowed down writes
+DROPPED_TRIGRAM_INDEXES = (
+    "ix_drugs_name_trgm",
+    "ix_egyptian_drugs_trade_name_en_trgm",
+    "ix_egyptian_drugs_trade_name_ar_trgm",
+    "ix_egyptian_drugs_generic_name_trgm",
+)
+
+
+def _create_trigram_indexes(engine: Engine):
+    """pg_trgm GIN index for local search, plus its table (PostgreSQL only)."""
+    from .services.local_search import TRIGRAM_TABLE_DDL, TRIGRAM_INDEX_DDL
+
+    if engine.dialect.name != "postgresql":
+        return
+    with engine.begin() as conn:
+        conn.execute(text(TRIGRAM_TABLE_DDL))
+        for index in DROPPED_TRIGRAM_INDEXES:
+            conn.execute(text(f"DROP INDEX IF EXISTS {index}"))
+    try:
+        with engine.begin() as conn:
+            conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+    except Exception as e:
+        print(f"pg_trgm unavailable, name search will scan without trigram indexes: {e}")
+        return
+    with engine.begin() as conn:
+        conn.execute(text(TRIGRAM_INDEX_DDL))
+
+
+# Tables whose in-memory views (index, matrix, check cache) must notice every change,
+# including in-place UPDATEs made by other processes
+VERSIONED_TABLES = ("interactions",)
+
+
+def _version_bump(table: str) -> str:
+    return f"UPDATE data_versions SET version = version + 1 WHERE name = '{table}';"
+
+
+def _sqlite_version_triggers(table: str) -> dict:
+    """Trigger name -> CREATE TRIGGER statement for a versioned table (SQLite: row-level only)."""
+    return {
+        f"{table}_version_{operation.lower()}":
+            f"CREATE TRIGGER IF NOT EXISTS {table}_version_{operation.lower()} "
+            f"AFTER {operation} ON {table} BEGIN {_version_bump(table)} END"
+        for operation in ("INSERT", "UPDATE", "DELETE")
+    }
+
+
+def _create_data_version_triggers(engine: Engine):
+    """Seed `data_versions` and add triggers that bump a table's version on every write."""
+    tables = set(inspect(engine).get_table_names())
+    if "data_versions" not in tables:
+        return
+    with engine.begin() as conn:
+        for table in VERSIONED_TABLES:
+            if table not in tables:
+                continue
+            conn.execute(text(
+                "INSERT INTO data_versions (name, version) SELECT :name, 0 "
+                "WHERE NOT EXISTS (SELECT 1 FROM data_versions WHERE name = :name)"
+            ), {"name": table})
+            bump = _version_bump(table)
+            if engine.dialect.name == "sqlite":
+                for ddl in _sqlite_version_triggers(table).values():
+                    conn.execute(text(ddl))
+            elif engine.dialect.name == "postgresql":
+                conn.execute(text(
+                    f"CREATE OR REPLACE FUNCTION {table}_version_bump() RETURNS trigger AS $$ "
+                    f"BEGIN {bump} RETURN NULL; END $$ LANGUAGE plpgsql"
+                ))
+                exists = conn.execute(text("SELECT 1 FROM pg_trigger WHERE tgname = :name"),
+                                      {"name": f"{table}_version"}).first()
+                if not exists:
+                    conn.execute(text(
+                        f"CREATE TRIGGER {table}_version AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE "
+                        f"ON {table} FOR EACH STATEMENT EXECUTE PROCEDURE {table}_version_bump()"
+                    ))
+
+
+@contextmanager
+def bulk_write(conn, table: str):
+    """
+    Wrap a bulk write to a versioned table so its version is bumped once, not once per row.
+    SQLite has no statement-level triggers: the bump runs first (opening the transaction and
+    taking the write lock, which pysqlite only does for DML), then the row triggers are dropped
+    and recreated before the caller commits. DDL is transactional, so no other connection ever
+    sees the table without them, and a rollback restores them.
+    PostgreSQL's statement-level trigger already fires once per statement.
+    """
+    if conn.dialect.name != "sqlite" or table not in VERSIONED_TABLES:
+        yield
+        return
+    triggers = _sqlite_version_triggers(table)
+    existing = [name for (name,) in conn.execute(
+        text("SELECT name FROM sqlite_master WHERE type = 'trigger' AND tbl_name = :table"), {"table": table}
+    ) if name in triggers]
+    if not existing:
+        yield
+        return
+    conn.execute(text(_version_bump(table)))
+    for name in existing:
+        conn.execute(text(f"DROP TRIGGER {name}"))
+    yield
+    for name in existing:
+        conn.execute(text(triggers[name]))
+
+
+if __name__ == "__main__":
+    # Explicit schema step for deployments that start the API with FAST_STARTUP=1:
+    #   python -m backend.migrations
+    from .database import engine
+
+    started = time.perf_counter()
+    migrate(engine)
+    print(f"Schema up to date ({engine.url.render_as_string(hide_password=True)}) "
+          f"in {(time.perf_counter() - started) * 1000:.0f} ms")
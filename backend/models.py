@@ -1,6 +1,21 @@
-from sqlalchemy import Column, Integer, String, Text, Index
+from sqlalchemy import Column, Integer, String, Text, Float, Index
 from .database import Base
 
+# Severity keywords -> rank (higher is more serious)
+SEVERITY_RANK = {"contraindicated": 4, "major": 3, "severe": 3, "moderate": 2, "minor": 1}
+
+def severity_rank(severity: str) -> int:
+    severity = (severity or "").lower()
+    return max((rank for key, rank in SEVERITY_RANK.items() if key in severity), default=0)
+
+def make_pair_key(rxcui_1: str, rxcui_2: str) -> str:
+    """Canonical unordered pair key: "<min>|<max>"."""
+    return f"{rxcui_1}|{rxcui_2}" if rxcui_1 <= rxcui_2 else f"{rxcui_2}|{rxcui_1}"
+
+def _default_pair_key(context):
+    params = context.get_current_parameters()
+    return make_pair_key(params["drug_1_rxcui"], params["drug_2_rxcui"])
+
 class Drug(Base):
     __tablename__ = "drugs"
     
@@ -18,10 +33,13 @@ class Interaction(Base):
     description = Column(Text)
     severity = Column(String)
     source = Column(String, default="local")
+    # Canonical unordered pair (see make_pair_key); filled automatically on insert
+    pair_key = Column(String, nullable=False, default=_default_pair_key)
     
     # Composite index for faster interaction lookups
     __table_args__ = (
         Index('idx_drug_interaction', 'drug_1_rxcui', 'drug_2_rxcui'),
+        Index('uq_interaction_pair', 'pair_key', unique=True),  # One row per unordered pair
         Index('idx_severity', 'severity'),  # Index for filtering by severity
     )
 
@@ -39,3 +57,45 @@ class EgyptianDrug(Base):
     adult_dose = Column(Text)
     child_dose = Column(Text)
     price_egp = Column(String)
+
+class DataVersion(Base):
+    """Change counter per table, bumped by triggers on every insert/update/delete (see migrations)."""
+    __tablename__ = "data_versions"
+
+    name = Column(String, primary_key=True)  # Table name
+    version = Column(Integer, nullable=False, default=0)
+
+class AdverseEventSignal(Base):
+    """Cached OpenFDA adverse-event result for an unordered drug pair."""
+    __tablename__ = "adverse_event_signals"
+
+    pair_key = Column(String, primary_key=True)  # "<a>|<b>" with a <= b
+    result = Column(Text, nullable=False)  # JSON payload from OpenFDAService
+    fetched_at = Column(Float, nullable=False, index=True)  # Unix timestamp
+
+class FoodInteractionRule(Base):
+    """Drug-food rule loaded from data/food_interactions.csv."""
+    __tablename__ = "food_interaction_rules"
+
+    id = Column(Integer, primary_key=True, index=True)
+    drug_name = Column(String, nullable=False)  # As written in the CSV (generic or class name)
+    drug_key = Column(String, nullable=False, index=True)  # Normalized (see rule_store.normalize_key)
+    food = Column(String, nullable=False)
+    severity = Column(String)
+    color = Column(String)
+    description_en = Column(Text)
+    description_ar = Column(Text)
+
+class ConditionInteractionRule(Base):
+    """Drug-condition rule loaded from data/condition_interactions.csv."""
+    __tablename__ = "condition_interaction_rules"
+
+    id = Column(Integer, primary_key=True, index=True)
+    drug_name = Column(String, nullable=False)
+    drug_key = Column(String, nullable=False, index=True)
+    condition = Column(String, nullable=False)  # Display name from the CSV
+    condition_id = Column(String, nullable=False, index=True)  # Normalized condition ID
+    severity = Column(String)
+    color = Column(String)
+    description_en = Column(Text)
+    description_ar = Column(Text)
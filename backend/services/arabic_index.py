@@ -0,0 +1,94 @@
+import re
+from difflib import SequenceMatcher
+from types import MappingProxyType
+
+_DIACRITICS = re.compile(r'[\u064B-\u065F]')
+_ALEF = re.compile(r'[آأإ]')
+
+def normalize_arabic(text: str) -> str:
+    """Normalize Arabic text for better matching."""
+    # Remove diacritics/tashkeel
+    text = _DIACRITICS.sub('', text)
+    # Remove tatweel
+    text = text.replace('\u0640', '')
+    # Normalize alef variations
+    text = _ALEF.sub('ا', text)
+    # Normalize taa marbuta
+    text = text.replace('ة', 'ه')
+    # Normalize yaa
+    text = text.replace('ى', 'ي')
+    return text.strip()
+
+def _bigrams(text: str) -> set:
+    padded = f" {text} "
+    return {padded[i:i + 2] for i in range(len(padded) - 1)}
+
+
+class ArabicNameIndex:
+    """
+    Precomputed lookup for Arabic drug names: normalized-key dict for exact hits and a
+    character-bigram inverted index so fuzzy lookups only score names sharing bigrams with
+    the query instead of the whole map.
+    """
+    # Only this many best-overlapping names are scored with SequenceMatcher
+    MAX_SCORED = 15
+
+    def __init__(self, entries: dict):
+        """`entries` maps Arabic name -> English name; earlier entries win on normalized clashes."""
+        exact = {}
+        normalized = {}
+        for arabic, english in entries.items():
+            exact.setdefault(arabic, english)
+            normalized.setdefault(normalize_arabic(arabic), english)
+
+        grams = {}
+        for key in normalized:
+            for gram in _bigrams(key):
+                grams.setdefault(gram, []).append(key)
+
+        self._exact = MappingProxyType(exact)
+        self._normalized = MappingProxyType(normalized)
+        self._grams = MappingProxyType({gram: tuple(keys) for gram, keys in grams.items()})
+
+    def __len__(self):
+        return len(self._normalized)
+
+    def lookup(self, name: str):
+        """Exact or normalized match, else None."""
+        if name in self._exact:
+            return self._exact[name]
+        return self._normalized.get(normalize_arabic(name))
+
+    def candidates(self, name: str, limit: int = 5, min_score: float = 0.0) -> list:
+        """Ranked fuzzy candidates: [{"arabic", "name", "score"}], best first."""
+        query = normalize_arabic(name)
+        if not query:
+            return []
+
+        query_grams = _bigrams(query)
+        overlap = {}
+        for gram in query_grams:
+            for key in self._grams.get(gram, ()):
+                overlap[key] = overlap.get(key, 0) + 1
+        # Shortlist by bigram Dice coefficient (a key of length n has n + 1 padded bigrams)
+        dice = {key: 2 * count / (len(query_grams) + len(key) + 1) for key, count in overlap.items()}
+        shortlist = sorted(dice, key=lambda k: -dice[k])[:self.MAX_SCORED]
+
+        scored = []
+        for key in shortlist:
+            score = self._score(query, key)
+            if score >= min_score:
+                scored.append({"arabic": key, "name": self._normalized[key], "score": round(score, 3)})
+        scored.sort(key=lambda c: -c["score"])
+        return scored[:limit]
+
+    @staticmethod
+    def _score(query: str, target: str) -> float:
+        # Same tiers as FuzzyIndex.similar (exact, prefix 0.9, substring 0.8), then similarity ratio
+        if query == target:
+            return 1.0
+        if target.startswith(query) or query.startswith(target):
+            return 0.9
+        if query in target or target in query:
+            return 0.8
+        return SequenceMatcher(None, query, target).ratio()
@@ -0,0 +1,21 @@
+import asyncio
+import contextvars
+import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+# Dedicated pool for blocking I/O (requests, SQLAlchemy) awaited from async endpoints.
+# Sized independently of the Starlette threadpool that serves sync endpoints.
+IO_THREADS = int(os.getenv("ASYNC_IO_THREADS", "64"))
+
+_executor = ThreadPoolExecutor(max_workers=IO_THREADS, thread_name_prefix="async-io")
+
+
+async def run_io(func, *args, **kwargs):
+    """
+    Run a blocking call on the shared I/O pool without blocking the event loop.
+    The caller's context goes with it, so per-request metrics keep counting in the pool thread.
+    """
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(_executor, partial(context.run, func, *args, **kwargs))
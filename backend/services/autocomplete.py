@@ -0,0 +1,169 @@
+import math
+import threading
+from sqlalchemy.orm import Session
+from ..database import ReadSessionLocal
+from ..models import Drug, EgyptianDrug
+from .arabic_index import normalize_arabic
+from .drug_class_registry import DrugClassRegistry
+from .interaction_index import interaction_index
+
+
+def _normalize(text: str) -> str:
+    return " ".join(normalize_arabic(text).lower().split())
+
+
+class PrefixTrie:
+    """
+    Prefix trie where every node stores its precomputed top-k entries, so a lookup
+    costs one walk down the prefix and no scan of the subtree.
+    """
+
+    def __init__(self, top_k: int = 10):
+        self.top_k = top_k
+        self._root = {}
+        self._top = {}  # id(node) -> [entry index, ...] best first
+        self.entries = []  # [(score, text, payload)]
+        self.nodes = 1
+
+    def add(self, keys: list, score: float, text: str, payload: dict):
+        """Index one entry under every key (e.g. the full name and each word start)."""
+        index = len(self.entries)
+        self.entries.append((score, text, payload))
+        touched = set()
+        for key in keys:
+            node = self._root
+            for char in key:
+                child = node.get(char)
+                if child is None:
+                    child = node[char] = {}
+                    self.nodes += 1
+                node = child
+                if id(node) not in touched:
+                    touched.add(id(node))
+                    self._offer(node, index)
+
+    def _offer(self, node: dict, index: int):
+        top = self._top.setdefault(id(node), [])
+        top.append(index)
+        top.sort(key=lambda i: (-self.entries[i][0], self.entries[i][1]))
+        del top[self.top_k:]
+
+    def lookup(self, prefix: str, limit: int) -> list:
+        node = self._root
+        for char in prefix:
+            node = node.get(char)
+            if node is None:
+                return []
+        return [self.entries[i] for i in self._top.get(id(node), [])[:limit]]
+
+
+class AutocompleteService:
+    """
+    Typeahead suggestions from DrugClassRegistry, RxNavService.DRUG_SYNONYMS, ARABIC_MAP and
+    `egyptian_drugs`, ranked by a popularity score precomputed at build time:
+    source weight + log(number of known interactions) + log(number of Egyptian products).
+    Requests only walk the in-memory trie; the DB is read only when (re)building.
+    """
+    TOP_K = 10
+
+    # Base weight per source
+    WEIGHT_GENERIC = 3.0
+    WEIGHT_BRAND = 2.0
+    WEIGHT_ARABIC = 1.5
+
+    def __init__(self):
+        self._trie = None
+        self._stale = True
+        self._lock = threading.Lock()
+
+    def invalidate(self):
+        self._stale = True
+
+    def suggest(self, prefix: str, limit: int = TOP_K) -> list:
+        if self._stale:
+            self.build()
+        prefix = _normalize(prefix)
+        if not prefix:
+            return []
+        limit = max(1, min(limit, self.TOP_K))
+        return [dict(payload, text=text, score=round(score, 3))
+                for score, text, payload in self._trie.lookup(prefix, limit)]
+
+    def build(self, db: Session = None) -> dict:
+        from .rxnav_service import RxNavService
+
+        own_session = db is None
+        if own_session:
+            db = ReadSessionLocal()
+        try:
+            with self._lock:
+                try:
+                    drug_rows = db.query(Drug.rxcui, Drug.name).all()
+                    egyptian_rows = db.query(
+                        EgyptianDrug.trade_name_en, EgyptianDrug.trade_name_ar, EgyptianDrug.generic_name
+                    ).all()
+                except Exception as e:
+                    print(f"Autocomplete: DB unavailable, using static sources only: {e}")
+                    drug_rows, egyptian_rows = [], []
+
+                rxcui_by_name = {name.lower(): rxcui for rxcui, name in drug_rows if name}
+                for drugs in DrugClassRegistry.CLASSES.values():
+                    for d in drugs:
+                        rxcui_by_name.setdefault(d["name"].lower(), d["rxcui"])
+                # Synonyms share their generic's RxCUI (e.g. Acetylsalicylic Acid -> Aspirin)
+                for generic, brands in RxNavService.DRUG_SYNONYMS.items():
+                    if generic in rxcui_by_name:
+                        for brand in brands:
+                            rxcui_by_name.setdefault(brand, rxcui_by_name[generic])
+
+                products = {}
+                for _, _, generic in egyptian_rows:
+                    key = (generic or "").strip().lower()
+                    products[key] = products.get(key, 0) + 1
+
+                def popularity(generic: str) -> float:
+                    generic = generic.lower()
+                    rxcui = rxcui_by_name.get(generic)
+                    degree = len(interaction_index.neighbors(rxcui)) if rxcui else 0
+                    return math.log1p(degree) + math.log1p(products.get(generic, 0))
+
+                # text key -> (score, display text, payload); duplicates keep the best score
+                entries = {}
+
+                def offer(text: str, generic: str, weight: float):
+                    if not text or not generic:
+                        return
+                    score = weight + popularity(generic)
+                    key = _normalize(text)
+                    if key in entries and entries[key][0] >= score:
+                        return
+                    entries[key] = (score, text, {"name": generic, "rxcui": rxcui_by_name.get(generic.lower())})
+
+                for drugs in DrugClassRegistry.CLASSES.values():
+                    for d in drugs:
+                        offer(d["name"], d["name"], self.WEIGHT_GENERIC)
+                for generic, brands in RxNavService.DRUG_SYNONYMS.items():
+                    offer(generic.title(), generic.title(), self.WEIGHT_GENERIC)
+                    for brand in brands:
+                        offer(brand.title(), generic.title(), self.WEIGHT_BRAND)
+                for arabic, english in RxNavService.ARABIC_MAP.items():
+                    offer(arabic, english, self.WEIGHT_ARABIC)
+                for trade_en, trade_ar, generic in egyptian_rows:
+                    offer(trade_en, generic, self.WEIGHT_BRAND)
+                    offer(trade_ar, generic, self.WEIGHT_ARABIC)
+
+                trie = PrefixTrie(top_k=self.TOP_K)
+                for key, (score, text, payload) in entries.items():
+                    # Match from the start of the name and from the start of each later word
+                    words = key.split(" ")
+                    keys = [" ".join(words[i:]) for i in range(len(words))]
+                    trie.add(keys, score, text, payload)
+
+                self._trie = trie
+                self._stale = False
+                return {"entries": len(trie.entries), "nodes": trie.nodes}
+        finally:
+            if own_session:
+                db.close()
+
+autocomplete_service = AutocompleteService()
@@ -0,0 +1,92 @@
+import os
+import time
+from sqlalchemy.orm import Session
+from ..database import ReadSessionLocal
+from .cache import TTLCache
+from .interaction_index import interaction_index, interactions_fingerprint
+from .interaction_matrix import interaction_matrix
+from .metrics import metrics
+
+
+def degraded(fda_result: dict) -> bool:
+    """OpenFDA result that stands in for a real answer (deadline hit, breaker open, upstream error)."""
+    return bool(fda_result.get("timed_out") or fda_result.get("unavailable") or "error" in fda_result)
+
+
+class CheckResultCache:
+    """
+    Resolved check data for medication sets seen before: drug names, local interactions and
+    OpenFDA results per pair, keyed by the sorted RxCUIs. Responses are re-assembled from it
+    in the caller's drug order, and food/condition rules are applied per request, so lists
+    with the same drugs share one entry whatever their order or conditions.
+
+    Cleared by invalidate() when ingestion or generate_and_save changes the interactions
+    table in this process, and (throttled) when the table fingerprint changes under us,
+    e.g. after ingest_data.py or generate_interactions.py ran in another process.
+    """
+    MAX_ENTRIES = int(os.getenv("CHECK_CACHE_MAX", "5000"))
+    TTL = float(os.getenv("CHECK_CACHE_TTL", str(60 * 60)))
+    REFRESH_INTERVAL = float(os.getenv("CHECK_CACHE_REFRESH_SECONDS", "30"))
+
+    def __init__(self):
+        self._entries = TTLCache(maxsize=self.MAX_ENTRIES, ttl=self.TTL)
+        self._fingerprint = None
+        self._last_check = 0.0
+        self.generation = 0  # Bumped on invalidation; results computed before it are dropped
+
+    def key(self, rxcuis: list[str]) -> tuple:
+        return tuple(sorted(rxcuis))
+
+    def get(self, rxcuis: list[str]):
+        """(names, local_index, fda_by_canonical_pair) or None."""
+        self.ensure_fresh()
+        entry = self._entries.get(self.key(rxcuis), None)
+        metrics.cache("check_results", "miss" if entry is None else "hit")
+        return entry
+
+    def put(self, generation: int, rxcuis: list[str], names: dict, local_index: dict, fda_shared: dict):
+        """Store data resolved while `generation` was current (read it before resolving)."""
+        if generation != self.generation:
+            return  # The tables changed while this check ran
+        # Degraded answers (unresolved names, deadline hit, breaker open, upstream errors) are never reused
+        if not all(names.get(rxcui) for rxcui in rxcuis):
+            return
+        if any(degraded(r) for r in fda_shared.values()):
+            return
+        self._entries.set(self.key(rxcuis), (names, local_index, fda_shared))
+
+    def invalidate(self):
+        self.generation += 1
+        self._entries.clear()
+
+    def ensure_fresh(self, db: Session = None):
+        """Drop every entry if the interactions table changed since the last check (throttled)."""
+        if time.monotonic() - self._last_check < self.REFRESH_INTERVAL:
+            return
+        self._last_check = time.monotonic()
+        own_session = db is None
+        if own_session:
+            db = ReadSessionLocal()
+        try:
+            fingerprint = interactions_fingerprint(db)
+        finally:
+            if own_session:
+                db.close()
+        if fingerprint != self._fingerprint:
+            if self._fingerprint is not None:
+                # Make the lookup structures catch up too, or the next miss would re-cache their stale view
+                interaction_index.invalidate()
+                interaction_matrix.invalidate()
+                self.invalidate()
+            self._fingerprint = fingerprint
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.MAX_ENTRIES,
+            "ttl_seconds": self.TTL,
+            "hits": self._entries.hits,
+            "misses": self._entries.misses,
+        }
+
+check_cache = CheckResultCache()
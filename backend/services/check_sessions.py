@@ -0,0 +1,150 @@
+import asyncio
+import os
+import secrets
+from .async_io import run_io
+from .cache import TTLCache
+from .check_cache import check_cache, degraded
+from .interaction_service import interaction_service
+from .rxnav_service import rxnav_service
+
+
+class CheckSession:
+    """Everything already evaluated for one medication list."""
+
+    def __init__(self):
+        self.rxcuis = []
+        self.conditions = []
+        self.names = {}
+        self.pairs = set()  # Canonical pairs already evaluated
+        self.local = {}  # Canonical pair -> local interaction
+        self.fda = {}  # Canonical pair -> OpenFDA result
+        self.food = {}  # Drug name -> food matches
+        self.condition = {}  # (drug name, condition) -> condition matches
+        self.generation = None  # check_cache.generation the pairs above were resolved under
+        self.lock = asyncio.Lock()  # One change at a time per list
+
+
+class CheckSessionStore:
+    """
+    Server-side state for lists built up one drug at a time (DrugListManager).
+    Each change only evaluates what is new: the pairs involving added drugs, plus their
+    food/condition rules. Building an N-drug list costs O(N^2) pair checks in total instead
+    of re-checking every pair after each addition.
+    Sessions expire after TTL seconds without use; clients re-create them on 404.
+
+    Resolved pairs are shared with check_cache both ways, and dropped when its generation
+    moves on (ingestion, generate_and_save, or a change seen from another process).
+    Changes run on the same async pipeline as check_cached_async: names and local lookups
+    go to the I/O pool and the OpenFDA fan-out is awaited, so no request thread waits on it.
+    """
+    MAX_SESSIONS = int(os.getenv("CHECK_SESSION_MAX", "10000"))
+    TTL = float(os.getenv("CHECK_SESSION_TTL", str(30 * 60)))
+
+    def __init__(self):
+        self._sessions = TTLCache(maxsize=self.MAX_SESSIONS, ttl=self.TTL)
+
+    async def create(self, rxcuis: list[str], conditions: list[str]) -> dict:
+        session_id = secrets.token_urlsafe(16)
+        session = CheckSession()
+        self._sessions.set(session_id, session)
+        return await self._sync(session_id, session, rxcuis, conditions)
+
+    async def update(self, session_id: str, rxcuis: list[str], conditions: list[str]):
+        """Replace the session's list; returns the full check response, or None if the session is gone."""
+        session = self._sessions.get(session_id, None)
+        if session is None:
+            return None
+        return await self._sync(session_id, session, rxcuis, conditions)
+
+    async def add_drug(self, session_id: str, rxcui: str):
+        session = self._sessions.get(session_id, None)
+        if session is None:
+            return None
+        rxcuis = session.rxcuis if rxcui in session.rxcuis else session.rxcuis + [rxcui]
+        return await self._sync(session_id, session, rxcuis, session.conditions)
+
+    async def remove_drug(self, session_id: str, rxcui: str):
+        session = self._sessions.get(session_id, None)
+        if session is None:
+            return None
+        rxcuis = [r for r in session.rxcuis if r != rxcui]
+        return await self._sync(session_id, session, rxcuis, session.conditions)
+
+    def delete(self, session_id: str):
+        self._sessions.delete(session_id)
+
+    async def _sync(self, session_id: str, session: CheckSession, rxcuis: list[str], conditions: list[str]) -> dict:
+        async with session.lock:
+            # The interactions table changed since these pairs were resolved: start over
+            # (names are kept, they don't depend on it)
+            await run_io(check_cache.ensure_fresh)
+            if session.generation != check_cache.generation:
+                session.pairs.clear()
+                session.local.clear()
+                session.fda.clear()
+                session.food.clear()
+                session.condition.clear()
+                session.generation = check_cache.generation
+
+            # Names: only drugs not resolved yet (including earlier lookup failures)
+            unresolved = [r for r in dict.fromkeys(rxcuis) if not session.names.get(r)]
+            newly_named = set()
+            if unresolved:
+                names = await interaction_service._timed_io(
+                    "check.names", interaction_service._with_session, rxnav_service.get_names, unresolved
+                )
+                for rxcui, name in names.items():
+                    session.names[rxcui] = name
+                    if name:
+                        newly_named.add(rxcui)
+
+            # Pairs: new ones, ones whose OpenFDA answer was degraded (timed out, breaker open,
+            # upstream error), and ones that only now have both names
+            list_pairs = set()
+            pending = set()
+            for i, id1 in enumerate(rxcuis):
+                for id2 in rxcuis[i + 1:]:
+                    key = interaction_service._pair_key(id1, id2)
+                    list_pairs.add(key)
+                    if (key not in session.pairs
+                            or degraded(session.fda.get(key, {}))
+                            or (key not in session.fda and (id1 in newly_named or id2 in newly_named))):
+                        pending.add(key)
+
+            evaluated = 0
+            if pending:
+                entry = await run_io(check_cache.get, rxcuis)
+                if entry is not None:
+                    # Same drugs already checked (by anyone, in any order)
+                    names, local, fda = entry
+                    session.names.update(names)
+                else:
+                    local, fda = await interaction_service._resolve_pairs_async(pending, session.names)
+                    evaluated = len(pending)
+                for key in pending:
+                    session.local.pop(key, None)
+                    if key in local:
+                        session.local[key] = local[key]
+                    if key in fda:
+                        session.fda[key] = fda[key]
+                session.pairs |= pending
+                if entry is None:
+                    check_cache.put(
+                        session.generation, rxcuis, {r: session.names.get(r) for r in rxcuis},
+                        {key: session.local[key] for key in list_pairs if key in session.local},
+                        {key: session.fda[key] for key in list_pairs if key in session.fda},
+                    )
+
+            session.rxcuis = list(rxcuis)
+            session.conditions = list(conditions or [])
+            response = interaction_service._assemble_response(
+                session.rxcuis, session.conditions, session.names, session.local, session.fda,
+                session.food, session.condition
+            )
+
+        self._sessions.set(session_id, session)  # Sliding expiry
+        response["session_id"] = session_id
+        response["evaluated_pairs"] = evaluated
+        return response
+
+check_sessions = CheckSessionStore()
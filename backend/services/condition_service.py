@@ -1,4 +1,5 @@
 from typing import List, Dict
+from .rule_store import rule_store, normalize_condition_id
 
 class ConditionInteractionService:
     # Condition Keywords -> (Drug Keywords -> Rule)
@@ -92,20 +93,14 @@ class ConditionInteractionService:
     def check_condition_interactions(self, drug_names: List[str], conditions: List[str]) -> List[Dict]:
         interactions = []
         for condition in conditions:
-            condition_id = condition.lower()
-            if condition_id not in self.CONDITION_RULES:
+            # Built-in rules plus everything ingested from data/condition_interactions.csv
+            index = rule_store.condition_index(normalize_condition_id(condition))
+            if index is None:
                 continue
-            
-            rules = self.CONDITION_RULES[condition_id]
-            
+
             for drug_name in drug_names:
-                d_lower = drug_name.lower()
-                
-                for rule in rules:
-                    # Check if any keyword in rule['drugs'] is in the drug name
-                    matched_keyword = next((k for k in rule['drugs'] if k in d_lower), None)
-                    
-                    if matched_keyword:
+                for generic in index.match(drug_name):
+                    for rule in index.rules[generic]:
                         interactions.append({
                             "drug": drug_name,
                             "condition": condition,
@@ -1,8 +1,10 @@
 from typing import List, Dict
+from .rule_store import rule_store
 
 class FoodInteractionService:
-    # MVP: Hardcoded rules for high-impact interactions
-    # In a real system, this would be in a DB
+    # Built-in rules for high-impact interactions.
+    # The full rule set is ingested from data/food_interactions.csv and served by rule_store,
+    # which falls back to these for generics the CSV doesn't cover.
     
     # Generic Name Keywords -> Rules
     FOOD_RULES = {
@@ -59,10 +61,11 @@ class FoodInteractionService:
 
     def check_food_interactions(self, drug_names: List[str]) -> List[Dict]:
         interactions = []
+        index = rule_store.food_index()
         for name in drug_names:
-            name_lower = name.lower()
-            for key, rule in self.FOOD_RULES.items():
-                if key in name_lower:
+            # Single pass over the name against every generic with rules
+            for generic in index.match(name):
+                for rule in index.rules[generic]:
                     interactions.append({
                         "drug": name,
                         "food": rule["food"],
@@ -0,0 +1,145 @@
+import bisect
+
+
+def levenshtein(a: str, b: str, max_distance: int = None) -> int:
+    """
+    Edit distance (Myers/Hyyro bit-parallel: one pass over the longer string, the shorter
+    one packed into an int bitmask). Returns max_distance + 1 when the bound is exceeded.
+    """
+    if a == b:
+        return 0
+    if len(a) < len(b):
+        a, b = b, a
+    if max_distance is not None and len(a) - len(b) > max_distance:
+        return max_distance + 1
+    if not b:
+        return len(a)
+
+    peq = {}  # char -> bitmask of its positions in b
+    for i, char in enumerate(b):
+        peq[char] = peq.get(char, 0) | (1 << i)
+    mask = (1 << len(b)) - 1
+    last = 1 << (len(b) - 1)
+    pv, mv, distance = mask, 0, len(b)
+    for char in a:
+        eq = peq.get(char, 0)
+        xv = eq | mv
+        xh = (((eq & pv) + pv) ^ pv) | eq
+        ph = mv | ~(xh | pv)
+        mh = pv & xh
+        if ph & last:
+            distance += 1
+        elif mh & last:
+            distance -= 1
+        ph = (ph << 1) | 1
+        mh <<= 1
+        pv = (mh | ~(xv | ph)) & mask
+        mv = ph & xv & mask
+    if max_distance is not None and distance > max_distance:
+        return max_distance + 1
+    return distance
+
+
+class FuzzyIndex:
+    """
+    BK-tree over Levenshtein distance, built once over a vocabulary of names.
+    A search only visits subtrees whose edge distance is within the tolerance band,
+    so lookup cost stays nearly flat as the vocabulary grows.
+    Partial names are found through a sorted suffix list (prefix / substring range scans).
+    Keys are compared lowercased; each key keeps the first display form it was added with.
+    """
+    PREFIX_SCORE = 0.9  # One of query / name starts with the other ("warf" -> warfarin)
+    SUBSTRING_SCORE = 0.8  # One contains the other
+
+    def __init__(self, names=()):
+        self._root = None  # [key, {distance: child}]
+        self._display = {}
+        self._suffixes = None  # Sorted [(suffix, offset, key)], built on first partial lookup
+        for name in names:
+            self.add(name)
+
+    def __len__(self):
+        return len(self._display)
+
+    def add(self, name: str):
+        key = name.strip().lower()
+        if not key or key in self._display:
+            return
+        self._display[key] = name.strip()
+        self._suffixes = None
+        if self._root is None:
+            self._root = [key, {}]
+            return
+        node = self._root
+        while True:
+            distance = levenshtein(key, node[0])
+            child = node[1].get(distance)
+            if child is None:
+                node[1][distance] = [key, {}]
+                return
+            node = child
+
+    def search(self, query: str, max_distance: int) -> list:
+        """[(display name, distance)] within `max_distance`, closest first."""
+        query = query.strip().lower()
+        if self._root is None or not query:
+            return []
+        found = []
+        stack = [self._root]
+        while stack:
+            key, children = stack.pop()
+            distance = levenshtein(query, key)
+            if distance <= max_distance:
+                found.append((self._display[key], distance))
+            for edge, child in children.items():
+                if distance - max_distance <= edge <= distance + max_distance:
+                    stack.append(child)
+        found.sort(key=lambda item: (item[1], item[0]))
+        return found
+
+    def similar(self, query: str, min_score: float, limit: int = None, substrings: bool = True) -> list:
+        """
+        [{"name", "score"}], best first. A name scores 1 - distance / longer length, or
+        PREFIX_SCORE / SUBSTRING_SCORE (unless `substrings` is off) when it and the query start
+        with / contain one another. The distance bound is derived from `min_score` and the query length.
+        """
+        query = query.strip()
+        # score >= min_score  =>  distance <= (1 - min_score) * longer length; bound by the query side
+        max_distance = max(1, int((1 - min_score) * len(query) / min_score))
+        scores = self._partial_matches(query.lower(), substrings)
+        for name, distance in self.search(query, max_distance):
+            key = name.lower()
+            scores[key] = max(scores.get(key, 0), 1 - distance / max(len(query), len(name)))
+        results = [
+            {"name": self._display[key], "score": round(score, 3)}
+            for key, score in scores.items() if score >= min_score
+        ]
+        results.sort(key=lambda r: (-r["score"], r["name"]))
+        return results[:limit] if limit else results
+
+    def _partial_matches(self, query: str, substrings: bool = True) -> dict:
+        """{key: PREFIX_SCORE or SUBSTRING_SCORE} for keys inside the query or containing it."""
+        found = {}
+
+        def record(key: str, score: float):
+            if score == self.SUBSTRING_SCORE and not substrings:
+                return
+            if score > found.get(key, 0):
+                found[key] = score
+
+        if not query:
+            return found
+        # Keys inside the query: probe each of its substrings
+        for start in range(len(query)):
+            for end in range(start + 1, len(query) + 1):
+                if query[start:end] in self._display:
+                    record(query[start:end], self.PREFIX_SCORE if start == 0 else self.SUBSTRING_SCORE)
+        # Keys containing the query: the suffixes that start with it are one contiguous range
+        if self._suffixes is None:
+            self._suffixes = sorted((key[i:], i, key) for key in self._display for i in range(len(key)))
+        for i in range(bisect.bisect_left(self._suffixes, (query,)), len(self._suffixes)):
+            suffix, offset, key = self._suffixes[i]
+            if not suffix.startswith(query):
+                break
+            record(key, self.PREFIX_SCORE if offset == 0 else self.SUBSTRING_SCORE)
+        return found
@@ -0,0 +1,196 @@
+import os
+import random
+import threading
+import time
+from urllib.parse import urlsplit
+import requests
+from requests.adapters import HTTPAdapter
+from .metrics import metrics
+
+
+class CircuitOpenError(requests.RequestException):
+    """Raised without touching the network while a host's circuit breaker is open."""
+
+
+class CircuitBreaker:
+    """
+    Per-host breaker: opens after FAILURE_THRESHOLD consecutive failures, fails fast for
+    RESET_TIMEOUT seconds, then lets a single trial request through (half-open).
+    """
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self.times_opened = 0
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return self.CLOSED
+        if time.monotonic() - self.opened_at < self.reset_timeout:
+            return self.OPEN
+        return self.HALF_OPEN
+
+    def allow(self) -> bool:
+        with self._lock:
+            state = self.state
+            if state == self.CLOSED:
+                return True
+            if state == self.HALF_OPEN and not self._trial_running:
+                self._trial_running = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial_running = False
+            if self.opened_at is not None or self.failures >= self.failure_threshold:
+                if self.opened_at is None:
+                    self.times_opened += 1
+                self.opened_at = time.monotonic()
+
+
+class _HostState:
+    def __init__(self, client: "HttpClient"):
+        self.semaphore = threading.BoundedSemaphore(client.MAX_PER_HOST)
+        self.breaker = CircuitBreaker(client.FAILURE_THRESHOLD, client.RESET_TIMEOUT)
+        self.requests = 0
+        self.retries = 0
+        self.failures = 0
+        self.rejected = 0  # Failed fast by the breaker or the concurrency limit
+
+
+class HttpClient:
+    """
+    Shared outbound HTTP client for RxNav and OpenFDA.
+
+    - One `requests.Session`, so connections are kept alive and pooled per host.
+    - At most MAX_PER_HOST requests in flight per host.
+    - Default timeout on every call.
+    - Retries on connection errors, timeouts and RETRY_STATUSES with jittered exponential backoff.
+    - A circuit breaker per host; callers catch CircuitOpenError (a RequestException)
+      and fall back to cached or local data.
+    """
+    TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "10"))
+    MAX_PER_HOST = int(os.getenv("HTTP_MAX_PER_HOST", "8"))
+    POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "16"))
+    RETRIES = int(os.getenv("HTTP_RETRIES", "2"))
+    BACKOFF = float(os.getenv("HTTP_BACKOFF", "0.3"))  # Base delay; doubles per attempt
+    FAILURE_THRESHOLD = int(os.getenv("HTTP_BREAKER_THRESHOLD", "5"))
+    RESET_TIMEOUT = float(os.getenv("HTTP_BREAKER_RESET_SECONDS", "30"))
+    RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+    def __init__(self):
+        self._session = requests.Session()
+        self._adapter = HTTPAdapter(pool_connections=self.POOL_SIZE, pool_maxsize=self.POOL_SIZE, max_retries=0)
+        self._session.mount("https://", self._adapter)
+        self._session.mount("http://", self._adapter)
+        self._hosts = {}
+        self._hosts_lock = threading.Lock()
+
+    def _host(self, url: str) -> _HostState:
+        host = urlsplit(url).netloc
+        with self._hosts_lock:
+            state = self._hosts.get(host)
+            if state is None:
+                state = self._hosts[host] = _HostState(self)
+            return state
+
+    def is_available(self, url: str) -> bool:
+        """False while the breaker for this URL's host is open (no request would be sent)."""
+        return self._host(url).breaker.state != CircuitBreaker.OPEN
+
+    def get(self, url: str, params: dict = None, timeout: float = None) -> requests.Response:
+        """
+        GET with pooling, retries and the circuit breaker. Returns the final response
+        (any status); raises a RequestException when every attempt failed or the breaker is open.
+        """
+        host = self._host(url)
+        netloc = urlsplit(url).netloc
+        timeout = timeout or self.TIMEOUT
+        if not host.semaphore.acquire(timeout=timeout):
+            host.rejected += 1
+            raise requests.Timeout(f"Too many concurrent requests to {netloc}")
+        try:
+            if not host.breaker.allow():
+                host.rejected += 1
+                raise CircuitOpenError(f"Circuit open for {netloc}")
+
+            for attempt in range(self.RETRIES + 1):
+                host.requests += 1
+                start = time.perf_counter()
+                try:
+                    response = self._session.get(url, params=params, timeout=timeout)
+                    metrics.upstream(netloc, response.status_code, time.perf_counter() - start)
+                    if response.status_code not in self.RETRY_STATUSES:
+                        host.breaker.record_success()
+                        return response
+                    error = None
+                except (requests.ConnectionError, requests.Timeout) as e:
+                    metrics.upstream(netloc, type(e).__name__, time.perf_counter() - start)
+                    response, error = None, e
+                except Exception as e:
+                    # Not worth retrying (broken chunking, redirect loop, undecodable body...), but
+                    # still a failed call: record it so a half-open trial always ends
+                    metrics.upstream(netloc, type(e).__name__, time.perf_counter() - start)
+                    host.failures += 1
+                    host.breaker.record_failure()
+                    raise
+
+                if attempt < self.RETRIES:
+                    host.retries += 1
+                    # Full jitter: spread retries from many threads over the backoff window
+                    time.sleep(random.uniform(0, self.BACKOFF * (2 ** attempt)))
+
+            host.failures += 1
+            host.breaker.record_failure()
+            if error is not None:
+                raise error
+            return response
+        finally:
+            host.semaphore.release()
+
+    def metrics(self) -> dict:
+        """Per-host request, retry and breaker counters plus connection pool reuse."""
+        pools = {}
+        connection_pools = self._adapter.poolmanager.pools
+        for pool_key in connection_pools.keys():  # keys() copies under the container's lock
+            pool = connection_pools.get(pool_key)
+            if pool is None:
+                continue
+            created = getattr(pool, "num_connections", 0)
+            served = getattr(pool, "num_requests", 0)
+            pools[pool.host] = {
+                "connections_opened": created,
+                "requests": served,
+                "connections_reused": max(0, served - created),
+            }
+
+        with self._hosts_lock:
+            hosts = dict(self._hosts)
+        return {
+            host: {
+                "requests": state.requests,
+                "retries": state.retries,
+                "failures": state.failures,
+                "rejected": state.rejected,
+                "breaker": state.breaker.state,
+                "breaker_opened": state.breaker.times_opened,
+                "pool": pools.get(host.split(":")[0], {}),
+            }
+            for host, state in hosts.items()
+        }
+
+http_client = HttpClient()
@@ -1,98 +1,236 @@
 import csv
+import time
 from sqlalchemy.orm import Session
-from ..models import Interaction, EgyptianDrug
+from sqlalchemy.dialects import postgresql, sqlite
+from .. import migrations
+from ..models import Interaction, EgyptianDrug, FoodInteractionRule, ConditionInteractionRule, make_pair_key
 from ..database import SessionLocal, engine
+from .interaction_index import interaction_index
+from .interaction_matrix import interaction_matrix
+from .check_cache import check_cache
+from .rule_store import rule_store, normalize_key, normalize_condition_id
+from .rxnav_service import rxnav_service
+from .local_search import local_search
+from .autocomplete import autocomplete_service
 
 class IngestionService:
+    # Rows per executemany batch in streaming mode
+    BATCH_SIZE = 5000
+
+    EGYPTIAN_DRUG_FIELDS = [
+        "manufacturer", "category", "forms", "strengths",
+        "adult_dose", "child_dose", "price_egp"
+    ]
+
     def ingest_csv(self, file_path: str):
         """
         Ingest interactions from a CSV file into the database.
         CSV Format: drug_1_rxcui,drug_2_rxcui,severity,description,source
         """
+        return self.ingest_csv_stream(file_path)["inserted"]
+
+    def ingest_egyptian_drugs(self, file_path: str):
+        """
+        Ingest Egyptian drugs from a CSV file into the database.
+        """
+        return self.ingest_egyptian_drugs_stream(file_path)["inserted"]
+
+    def ingest_csv_stream(self, file_path: str, batch_size: int = None) -> dict:
+        """
+        Streaming interaction ingestion: reads the CSV lazily, dedupes unordered pairs
+        against a key set preloaded from the table, and inserts in executemany batches.
+        Returns stats including rows/sec.
+        """
         db = SessionLocal()
         try:
-            count = 0
-            with open(file_path, mode='r', encoding='utf-8') as f:
-                # Filter out comment lines
-                lines = [line for line in f if not line.strip().startswith('#')]
-                reader = csv.DictReader(lines)
-                for row in reader:
-                    # Skip empty rows
-                    if not row.get('drug_1_rxcui') or not row.get('drug_2_rxcui'):
-                        continue
-                    
-                    # Check duplicates (simple check)
-                    exists = db.query(Interaction).filter(
-                        Interaction.drug_1_rxcui == row['drug_1_rxcui'],
-                        Interaction.drug_2_rxcui == row['drug_2_rxcui']
-                    ).first()
-                    
-                    if not exists:
-                        interaction = Interaction(
-                            drug_1_rxcui=row['drug_1_rxcui'],
-                            drug_2_rxcui=row['drug_2_rxcui'],
-                            severity=row['severity'],
-                            description=row['description'],
-                            source=row['source']
-                        )
-                        db.add(interaction)
-                        count += 1
-            
-            db.commit()
-            return count
+            # Preload existing pair keys once instead of one duplicate query per row
+            seen = {key for (key,) in db.query(Interaction.pair_key)}
+
+            def to_record(row):
+                # Skip empty rows
+                d1, d2 = row.get('drug_1_rxcui'), row.get('drug_2_rxcui')
+                if not d1 or not d2:
+                    return None
+                key = make_pair_key(d1, d2)
+                if key in seen:
+                    return None
+                seen.add(key)
+                return {
+                    "drug_1_rxcui": d1,
+                    "drug_2_rxcui": d2,
+                    "severity": row['severity'],
+                    "description": row['description'],
+                    "source": row['source'],
+                    "pair_key": key
+                }
+
+            stats = self._stream_insert(db, file_path, Interaction, to_record, batch_size, conflict_key="pair_key")
+            if stats["inserted"]:
+                interaction_index.invalidate()
+                interaction_matrix.invalidate()
+                check_cache.invalidate()
+            return stats
         except Exception as e:
             db.rollback()
             print(f"Error ingesting data: {e}")
-            return 0
+            return self._empty_stats()
         finally:
             db.close()
 
-
-    def ingest_egyptian_drugs(self, file_path: str):
+    def ingest_egyptian_drugs_stream(self, file_path: str, batch_size: int = None) -> dict:
         """
-        Ingest Egyptian drugs from a CSV file into the database.
+        Streaming Egyptian drug ingestion, deduped by (trade name, generic name).
         """
         db = SessionLocal()
         try:
-            count = 0
-            with open(file_path, mode='r', encoding='utf-8') as f:
-                # Filter out comment lines and skip header
-                lines = [line for line in f if not line.strip().startswith('#')]
-                reader = csv.DictReader(lines)
-                for row in reader:
-                    # Skip empty/invalid rows
-                    if not row.get('trade_name_en') or not row.get('trade_name_ar'):
-                        continue
-                    
-                    # Check if already exists (by trade name and generic name)
-                    exists = db.query(EgyptianDrug).filter(
-                        EgyptianDrug.trade_name_en == row['trade_name_en'],
-                        EgyptianDrug.generic_name == row['generic_name']
-                    ).first()
-                    
-                    if not exists:
-                        drug = EgyptianDrug(
-                            trade_name_en=row['trade_name_en'],
-                            trade_name_ar=row['trade_name_ar'],
-                            generic_name=row['generic_name'],
-                            manufacturer=row.get('manufacturer'),
-                            category=row.get('category'),
-                            forms=row.get('forms'),
-                            strengths=row.get('strengths'),
-                            adult_dose=row.get('adult_dose'),
-                            child_dose=row.get('child_dose'),
-                            price_egp=row.get('price_egp')
-                        )
-                        db.add(drug)
-                        count += 1
-            
-            db.commit()
-            return count
+            seen = set(db.query(EgyptianDrug.trade_name_en, EgyptianDrug.generic_name).all())
+
+            def to_record(row):
+                # Skip empty/invalid rows
+                if not row.get('trade_name_en') or not row.get('trade_name_ar'):
+                    return None
+                key = (row['trade_name_en'], row['generic_name'])
+                if key in seen:
+                    return None
+                seen.add(key)
+                record = {
+                    "trade_name_en": row['trade_name_en'],
+                    "trade_name_ar": row['trade_name_ar'],
+                    "generic_name": row['generic_name'],
+                }
+                for field in self.EGYPTIAN_DRUG_FIELDS:
+                    record[field] = row.get(field)
+                return record
+
+            stats = self._stream_insert(db, file_path, EgyptianDrug, to_record, batch_size)
+            if stats["inserted"]:
+                rxnav_service.invalidate_trade_names()
+                local_search.invalidate()
+                autocomplete_service.invalidate()
+            return stats
         except Exception as e:
             db.rollback()
             print(f"Error ingesting Egyptian drugs: {e}")
-            return 0
+            return self._empty_stats()
+        finally:
+            db.close()
+
+    def ingest_food_rules(self, file_path: str) -> dict:
+        """
+        Load data/food_interactions.csv into `food_interaction_rules`.
+        The CSV is the source of truth: the table is replaced in one transaction,
+        so edited or removed rules take effect on the next rule_store refresh.
+        CSV Format: drug_name,food,severity,color,description_en,description_ar
+        """
+        def to_record(row):
+            if not row.get('drug_name') or not row.get('food'):
+                return None
+            return {
+                "drug_name": row['drug_name'].strip(),
+                "drug_key": normalize_key(row['drug_name']),
+                "food": row['food'].strip(),
+                "severity": row.get('severity'),
+                "color": row.get('color'),
+                "description_en": row.get('description_en'),
+                "description_ar": row.get('description_ar'),
+            }
+
+        return self._replace_rules(file_path, FoodInteractionRule, to_record, "food rules")
+
+    def ingest_condition_rules(self, file_path: str) -> dict:
+        """
+        Load data/condition_interactions.csv into `condition_interaction_rules` (replacing it).
+        CSV Format: drug_name,condition,severity,color,description_en,description_ar
+        """
+        def to_record(row):
+            if not row.get('drug_name') or not row.get('condition'):
+                return None
+            return {
+                "drug_name": row['drug_name'].strip(),
+                "drug_key": normalize_key(row['drug_name']),
+                "condition": row['condition'].strip(),
+                "condition_id": normalize_condition_id(row['condition']),
+                "severity": row.get('severity'),
+                "color": row.get('color'),
+                "description_en": row.get('description_en'),
+                "description_ar": row.get('description_ar'),
+            }
+
+        return self._replace_rules(file_path, ConditionInteractionRule, to_record, "condition rules")
+
+    def _replace_rules(self, file_path: str, model, to_record, label: str) -> dict:
+        db = SessionLocal()
+        try:
+            db.query(model).delete()
+            stats = self._stream_insert(db, file_path, model, to_record)
+            rule_store.invalidate()
+            return stats
+        except Exception as e:
+            db.rollback()
+            print(f"Error ingesting {label}: {e}")
+            return self._empty_stats()
         finally:
             db.close()
 
+    def _iter_csv_rows(self, file_path: str):
+        """Lazily yield CSV rows, skipping comment lines."""
+        with open(file_path, mode='r', encoding='utf-8') as f:
+            lines = (line for line in f if not line.strip().startswith('#'))
+            for row in csv.DictReader(lines):
+                yield row
+
+    def _insert_statement(self, db: Session, model, conflict_key: str = None):
+        """Plain INSERT, or INSERT ... ON CONFLICT DO NOTHING when the dialect supports it."""
+        table = model.__table__
+        dialect = db.get_bind().dialect.name
+        if conflict_key and dialect == "sqlite":
+            return sqlite.insert(table).on_conflict_do_nothing(index_elements=[conflict_key])
+        if conflict_key and dialect == "postgresql":
+            return postgresql.insert(table).on_conflict_do_nothing(index_elements=[conflict_key])
+        return table.insert()
+
+    def _stream_insert(self, db: Session, file_path: str, model, to_record, batch_size: int = None,
+                       conflict_key: str = None) -> dict:
+        """
+        Insert records produced by `to_record(row)` (None = skip) in batches,
+        all inside one transaction.
+        """
+        batch_size = batch_size or self.BATCH_SIZE
+        statement = self._insert_statement(db, model, conflict_key)
+        started = time.perf_counter()
+        rows = inserted = 0
+        batch = []
+
+        with migrations.bulk_write(db.connection(), model.__tablename__):
+            for row in self._iter_csv_rows(file_path):
+                rows += 1
+                record = to_record(row)
+                if record is None:
+                    continue
+                batch.append(record)
+                if len(batch) >= batch_size:
+                    inserted += self._execute_batch(db, statement, batch)
+                    batch = []
+
+            if batch:
+                inserted += self._execute_batch(db, statement, batch)
+        db.commit()
+
+        seconds = time.perf_counter() - started
+        return {
+            "rows": rows,
+            "inserted": inserted,
+            "skipped": rows - inserted,
+            "seconds": round(seconds, 3),
+            "rows_per_sec": round(rows / seconds) if seconds > 0 else rows,
+        }
+
+    def _execute_batch(self, db: Session, statement, batch: list) -> int:
+        """Run one executemany batch; returns the rows actually written (conflict-skipped rows excluded)."""
+        result = db.connection().execute(statement, batch)
+        return result.rowcount if result.rowcount >= 0 else len(batch)
+
+    def _empty_stats(self) -> dict:
+        return {"rows": 0, "inserted": 0, "skipped": 0, "seconds": 0.0, "rows_per_sec": 0}
+
 ingestion_service = IngestionService()
@@ -1,6 +1,12 @@
+from sqlalchemy import update
 from sqlalchemy.orm import Session
 from .drug_class_registry import DrugClassRegistry
-from ..models import Interaction, Drug
+from .. import migrations
+from ..models import Interaction, Drug, make_pair_key, severity_rank
+from .interaction_index import interaction_index
+from .interaction_matrix import interaction_matrix
+from .check_cache import check_cache
+from .local_search import local_search
 
 class InteractionGenerator:
     def __init__(self):
@@ -73,71 +79,86 @@ class InteractionGenerator:
         for cls in dangerous_duplicates:
              self.rules.append((cls, cls, "Major", f"Duplicate Therapy: Concurrent use of multiple {cls} is generally not recommended."))
 
-    def generate_and_save(self, db: Session):
-        count = 0
-        
-        # 1. Ingest Drug Definitions first (Robustly)
-        # We use a set to track what we've added in this session to avoid session-level duplicates
-        seen_rxcuis = set()
-        
-        # Also pre-fetch existing drugs to avoid DB unique constraint errors
-        existing_drugs = db.query(Drug.rxcui).all()
-        for r in existing_drugs:
-            seen_rxcuis.add(r[0])
-
-        for class_name, drugs in self.classes.items():
-            for d in drugs:
-                rxcui = d['rxcui']
-                if rxcui not in seen_rxcuis:
-                    # Double check DB just in case (though pre-fetch should cover it)
-                    exists = db.query(Drug).filter_by(rxcui=rxcui).first()
-                    if not exists:
-                        try:
-                            db.add(Drug(rxcui=rxcui, name=d['name'], synonyms=class_name))
-                            seen_rxcuis.add(rxcui)
-                        except Exception:
-                            db.rollback() 
-                            pass # Skip if race condition or error
-        
-        # Commit drugs first to ensure foreign keys work
-        db.commit()
-
-        print("Generating interactions based on clinical classes...")
-        
-        for rule in self.rules:
-            class_a_name, class_b_name, severity, desc_template = rule
-            
+    def build_interactions(self) -> dict:
+        """
+        Expand every class rule into concrete drug pairs, in memory.
+        Returns {pair_key: {drug_1_rxcui, drug_2_rxcui, severity, description, source}}.
+        When several rules produce the same pair the highest severity wins (first rule on ties).
+        """
+        generated = {}
+        for class_a_name, class_b_name, severity, desc_template in self.rules:
             list_a = self.classes.get(class_a_name, [])
             list_b = self.classes.get(class_b_name, [])
-            
-            if not list_a or not list_b: continue
+            rank = severity_rank(severity)
 
             for drug_a in list_a:
                 for drug_b in list_b:
                     if drug_a['rxcui'] == drug_b['rxcui']: continue
-                    
-                    # Check if interaction exists (unordered pair check)
-                    exists = db.query(Interaction).filter(
-                        ((Interaction.drug_1_rxcui == drug_a['rxcui']) & (Interaction.drug_2_rxcui == drug_b['rxcui'])) |
-                        ((Interaction.drug_1_rxcui == drug_b['rxcui']) & (Interaction.drug_2_rxcui == drug_a['rxcui']))
-                    ).first()
-
-                    if not exists:
-                        interaction = Interaction(
-                            drug_1_rxcui=drug_a['rxcui'],
-                            drug_2_rxcui=drug_b['rxcui'],
-                            severity=severity,
-                            description=f"{desc_template} ({drug_a['name']} + {drug_b['name']})",
-                            source=f"Generated: {class_a_name}+{class_b_name}"
-                        )
-                        db.add(interaction)
-                        count += 1
-                        
-            # Commit occasionally
-            if count % 100 == 0:
-                db.commit()
-        
+
+                    key = make_pair_key(drug_a['rxcui'], drug_b['rxcui'])
+                    current = generated.get(key)
+                    if current and severity_rank(current["severity"]) >= rank:
+                        continue
+
+                    generated[key] = {
+                        "drug_1_rxcui": drug_a['rxcui'],
+                        "drug_2_rxcui": drug_b['rxcui'],
+                        "severity": severity,
+                        "description": f"{desc_template} ({drug_a['name']} + {drug_b['name']})",
+                        "source": f"Generated: {class_a_name}+{class_b_name}"
+                    }
+        return generated
+
+    def generate_and_save(self, db: Session):
+        """
+        Sync generated interactions into the table.
+        The full rule expansion is diffed against existing rows in one pass:
+        new pairs are bulk-inserted and previously generated rows whose rule changed are
+        updated, while curated (non-generated) rows are never touched. Safe to re-run.
+        """
+        # 1. Ingest Drug Definitions first (one pre-fetch, one bulk insert)
+        existing_rxcuis = {r[0] for r in db.query(Drug.rxcui).all()}
+        new_drugs = {}
+        for class_name, drugs in self.classes.items():
+            for d in drugs:
+                if d['rxcui'] not in existing_rxcuis and d['rxcui'] not in new_drugs:
+                    new_drugs[d['rxcui']] = {"rxcui": d['rxcui'], "name": d['name'], "synonyms": class_name}
+        if new_drugs:
+            db.connection().execute(Drug.__table__.insert(), list(new_drugs.values()))
+            local_search.invalidate()
+
+        print("Generating interactions based on clinical classes...")
+
+        # 2. Compute the desired set in memory
+        generated = self.build_interactions()
+
+        # 3. Diff against the existing table in one pass
+        to_update = []
+        for row_id, key, severity, description, source in db.query(
+            Interaction.id, Interaction.pair_key,
+            Interaction.severity, Interaction.description, Interaction.source
+        ):
+            wanted = generated.pop(key, None)
+            if wanted is None or not (source or "").startswith("Generated:"):
+                continue
+            if (severity, description, source) != (wanted["severity"], wanted["description"], wanted["source"]):
+                to_update.append({"id": row_id, "severity": wanted["severity"],
+                                  "description": wanted["description"], "source": wanted["source"]})
+
+        # 4. Bulk-write the delta
+        if generated or to_update:
+            with migrations.bulk_write(db.connection(), Interaction.__tablename__):
+                if generated:
+                    db.connection().execute(Interaction.__table__.insert(), list(generated.values()))
+                if to_update:
+                    db.execute(update(Interaction), to_update)
+
         db.commit()
+        count = len(generated)
+        if count or to_update:
+            interaction_index.invalidate()
+            interaction_matrix.invalidate()
+            check_cache.invalidate()
         return count
 
 interaction_generator = InteractionGenerator()
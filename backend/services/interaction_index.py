@@ -0,0 +1,158 @@
+import os
+import sys
+import threading
+import time
+from collections import namedtuple
+from types import MappingProxyType
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+from ..database import ReadSessionLocal
+from ..models import DataVersion, Interaction
+
+InteractionRecord = namedtuple(
+    "InteractionRecord", ["drug_1_rxcui", "drug_2_rxcui", "severity", "description", "source"]
+)
+
+
+def interactions_fingerprint(db: Session) -> tuple:
+    """
+    (row count, max id, data version) of `interactions`. The version is bumped by triggers on
+    every insert/update/delete (see migrations), so in-place UPDATEs from any process change it.
+    """
+    version = select(DataVersion.version).where(DataVersion.name == "interactions").scalar_subquery()
+    return tuple(db.query(func.count(Interaction.id), func.max(Interaction.id), version).one())
+
+
+class InteractionIndex:
+    """
+    Immutable in-memory view of the `interactions` table, keyed by canonical unordered pair.
+    Each (re)build produces fresh read-only mappings that are swapped in atomically, so
+    readers never see a half-built index and need no locking.
+    """
+    # How often to check whether another process (ingest_data.py, generate_interactions.py)
+    # changed the table
+    REFRESH_INTERVAL = float(os.getenv("INTERACTION_INDEX_REFRESH_SECONDS", "30"))
+
+    def __init__(self):
+        self._pairs = MappingProxyType({})
+        self._adjacency = MappingProxyType({})
+        self._fingerprint = None
+        self._loaded = False
+        self._stale = True
+        self._last_check = 0.0
+        self._build_lock = threading.Lock()
+
+    @staticmethod
+    def pair_key(id1: str, id2: str) -> tuple:
+        return (id1, id2) if id1 <= id2 else (id2, id1)
+
+    @property
+    def is_loaded(self) -> bool:
+        return self._loaded
+
+    def build(self, db: Session = None):
+        """Load every interaction into a fresh index and swap it in."""
+        own_session = db is None
+        if own_session:
+            db = ReadSessionLocal()
+        try:
+            with self._build_lock:
+                # Read first: a write landing mid-build then shows up as a change on the next check
+                fingerprint = interactions_fingerprint(db)
+                rows = db.query(
+                    Interaction.drug_1_rxcui, Interaction.drug_2_rxcui,
+                    Interaction.severity, Interaction.description, Interaction.source
+                ).order_by(Interaction.id).all()
+
+                pairs = {}
+                adjacency = {}
+                for row in rows:
+                    key = self.pair_key(row[0], row[1])
+                    if key in pairs:
+                        continue  # First row per pair wins, as with the SQL lookup
+                    pairs[key] = InteractionRecord(*row)
+                    adjacency.setdefault(key[0], set()).add(key[1])
+                    adjacency.setdefault(key[1], set()).add(key[0])
+
+                self._pairs = MappingProxyType(pairs)
+                self._adjacency = MappingProxyType({k: frozenset(v) for k, v in adjacency.items()})
+                self._fingerprint = fingerprint
+                self._loaded = True
+                self._stale = False
+                self._last_check = time.monotonic()
+            return len(pairs)
+        finally:
+            if own_session:
+                db.close()
+
+    def invalidate(self):
+        """Mark the index stale; it is rebuilt on the next lookup. Called after ingestion commits."""
+        self._stale = True
+
+    def ensure_fresh(self, db: Session = None):
+        """Rebuild if invalidated, or if the table changed since the last build (throttled)."""
+        if self._stale:
+            self.build(db)
+            return
+        if time.monotonic() - self._last_check < self.REFRESH_INTERVAL:
+            return
+        self._last_check = time.monotonic()
+        own_session = db is None
+        if own_session:
+            db = ReadSessionLocal()
+        try:
+            if interactions_fingerprint(db) != self._fingerprint:
+                self.build(db)
+        finally:
+            if own_session:
+                db.close()
+
+    def get(self, id1: str, id2: str):
+        return self._pairs.get(self.pair_key(id1, id2))
+
+    def lookup_many(self, rxcui_list: list[str]) -> dict:
+        """Return {canonical_pair: InteractionRecord} for every interacting pair in the list."""
+        pairs = self._pairs
+        unique_ids = sorted(set(rxcui_list))
+        found = {}
+        for i in range(len(unique_ids)):
+            for j in range(i, len(unique_ids)):
+                record = pairs.get((unique_ids[i], unique_ids[j]))
+                if record is not None:
+                    found[(unique_ids[i], unique_ids[j])] = record
+        return found
+
+    def neighbors(self, rxcui: str) -> frozenset:
+        """All RxCUIs with a recorded interaction with `rxcui`."""
+        return self._adjacency.get(rxcui, frozenset())
+
+    def memory_footprint(self) -> dict:
+        """Approximate memory used by the index (containers, keys and records)."""
+        pairs = self._pairs
+        adjacency = self._adjacency
+        seen = set()
+
+        def size(obj):
+            if id(obj) in seen:
+                return 0
+            seen.add(id(obj))
+            return sys.getsizeof(obj)
+
+        pairs_bytes = size(dict(pairs))
+        for key, record in pairs.items():
+            pairs_bytes += size(key) + sum(size(k) for k in key)
+            pairs_bytes += size(record) + sum(size(f) for f in record if f is not None)
+
+        adjacency_bytes = size(dict(adjacency))
+        for rxcui, linked in adjacency.items():
+            adjacency_bytes += size(rxcui) + size(linked)
+
+        return {
+            "pairs": len(pairs),
+            "drugs": len(adjacency),
+            "pairs_bytes": pairs_bytes,
+            "adjacency_bytes": adjacency_bytes,
+            "total_bytes": pairs_bytes + adjacency_bytes,
+        }
+
+interaction_index = InteractionIndex()
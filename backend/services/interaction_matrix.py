@@ -0,0 +1,317 @@
+import json
+import mmap
+import os
+import struct
+import sys
+import threading
+import time
+from array import array
+from sqlalchemy.orm import Session
+from ..database import ReadSessionLocal
+from ..models import Interaction, severity_rank
+from .drug_class_registry import DrugClassRegistry
+from .interaction_index import InteractionRecord, interactions_fingerprint
+
+MAGIC = b"DSIMTX01"
+_HEADER_LEN = struct.Struct("<I")
+
+
+def _triangle_size(n: int) -> int:
+    return n * (n - 1) // 2
+
+
+def _cell(n: int, i: int, j: int) -> int:
+    """Offset of pair (i, j), i < j, in the packed upper triangle."""
+    return i * (2 * n - i - 1) // 2 + (j - i - 1)
+
+
+def _pad4(buffer: bytearray):
+    buffer.extend(b"\0" * (-len(buffer) % 4))
+
+
+class _MatrixFile:
+    """One loaded artifact: memory-mapped arrays plus the interned side tables from the header."""
+
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            self.mtime = os.fstat(f.fileno()).st_mtime_ns  # A rebuilt artifact replaces the file
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(self._mm)
+        if bytes(view[:len(MAGIC)]) != MAGIC:
+            raise ValueError(f"{path} is not an interaction matrix file")
+        (header_len,) = _HEADER_LEN.unpack_from(self._mm, len(MAGIC))
+        start = len(MAGIC) + _HEADER_LEN.size
+        header = json.loads(bytes(view[start:start + header_len]).decode("utf-8"))
+        if header["byteorder"] != sys.byteorder:
+            raise ValueError(f"{path} was built on a {header['byteorder']}-endian machine")
+
+        self.path = path
+        self.built_at = header["built_at"]
+        self.fingerprint = tuple(header["fingerprint"])
+        self.rxcuis = header["rxcuis"]
+        self.ids = {rxcui: i for i, rxcui in enumerate(self.rxcuis)}
+        severities, descriptions, sources = header["severities"], header["descriptions"], header["sources"]
+        # Record 0 means "no interaction"
+        # Index -1 stands for NULL
+        self.records = [None] + [
+            (severities[s] if s >= 0 else None, descriptions[d] if d >= 0 else None,
+             sources[src] if src >= 0 else None)
+            for s, d, src in header["records"]
+        ]
+
+        sections = header["sections"]
+        self.severity = view[sections["severity"][0]:sections["severity"][1]]  # uint8 severity rank per cell
+        self.record = view[sections["record"][0]:sections["record"][1]].cast("I")  # record id << 1 | swapped
+        self.offsets = view[sections["offsets"][0]:sections["offsets"][1]].cast("I")  # CSR row starts
+        self.neighbors = view[sections["neighbors"][0]:sections["neighbors"][1]].cast("I")  # dense ids
+
+
+class InteractionMatrix:
+    """
+    Precomputed pairwise interaction matrix for every drug in DrugClassRegistry and `interactions`,
+    stored as one memory-mapped file (built offline by build_interaction_matrix.py).
+
+    Drugs get dense ids in RxCUI order. The file holds:
+    - the packed upper triangle of severity ranks (uint8) and of record ids (uint32, low bit
+      set when the row stored the pair in descending RxCUI order);
+    - per-drug neighbor lists (CSR), for "all interactions of X";
+    - interned severity / description / source tables in a JSON header.
+    A pair probe is two dict lookups and one array read; nothing touches SQL.
+
+    The artifact is only used while it matches the `interactions` table (count, max id and
+    data version, so updated rows count too); after a change InteractionService falls back to
+    the in-memory index until build_interaction_matrix.py is re-run, and the rebuilt file is
+    re-mapped on the next check.
+    """
+    PATH = os.getenv("INTERACTION_MATRIX_PATH", "interaction_matrix.bin")
+    REFRESH_INTERVAL = float(os.getenv("INTERACTION_MATRIX_REFRESH_SECONDS", "30"))
+
+    def __init__(self):
+        self._file = None
+        self._path = self.PATH
+        self._current = False
+        self._recheck = True
+        self._last_check = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def is_loaded(self) -> bool:
+        return self._file is not None
+
+    def write(self, db: Session, path: str = None) -> dict:
+        """Materialize the matrix from the DB into `path` (atomically replaced)."""
+        path = path or self.PATH
+        fingerprint = list(interactions_fingerprint(db))
+        rows = db.query(
+            Interaction.drug_1_rxcui, Interaction.drug_2_rxcui,
+            Interaction.severity, Interaction.description, Interaction.source
+        ).order_by(Interaction.id).all()
+
+        rxcuis = {d["rxcui"] for drugs in DrugClassRegistry.CLASSES.values() for d in drugs}
+        for d1, d2, *_ in rows:
+            rxcuis.update((d1, d2))
+        rxcuis = sorted(r for r in rxcuis if r)
+        ids = {rxcui: i for i, rxcui in enumerate(rxcuis)}
+        n = len(rxcuis)
+
+        interned = {"severities": {}, "descriptions": {}, "sources": {}}
+
+        def intern(table: str, value: str) -> int:
+            return interned[table].setdefault(value, len(interned[table]))
+
+        severity = bytearray(_triangle_size(n))
+        record = array("I", bytes(4 * _triangle_size(n)))
+        records = {}  # (severity, description, source) indexes -> record id
+        adjacency = [[] for _ in range(n)]
+        for d1, d2, sev, description, source in rows:
+            if not d1 or not d2 or d1 == d2:
+                continue
+            i, j = sorted((ids[d1], ids[d2]))
+            swapped = ids[d1] > ids[d2]
+            cell = _cell(n, i, j)
+            if record[cell]:
+                continue  # First row per pair wins, as with the in-memory index
+            key = (intern("severities", sev) if sev is not None else -1,
+                   intern("descriptions", description) if description is not None else -1,
+                   intern("sources", source) if source is not None else -1)
+            record[cell] = records.setdefault(key, len(records) + 1) << 1 | swapped
+            severity[cell] = severity_rank(sev)
+            adjacency[i].append(j)
+            adjacency[j].append(i)
+
+        offsets = array("I", [0])
+        neighbors = array("I")
+        for linked in adjacency:
+            neighbors.extend(sorted(linked))
+            offsets.append(len(neighbors))
+
+        header = {
+            "byteorder": sys.byteorder,
+            "built_at": time.time(),
+            "fingerprint": fingerprint,
+            "rxcuis": rxcuis,
+            "severities": list(interned["severities"]),
+            "descriptions": list(interned["descriptions"]),
+            "sources": list(interned["sources"]),
+            "records": [list(key) for key in records],
+        }
+
+        # Section offsets depend on the header length, which depends on the offsets: reserve
+        # a fixed-width placeholder, then fill it in
+        sections = {name: [0, 0] for name in ("severity", "record", "offsets", "neighbors")}
+        header["sections"] = {name: [10 ** 12, 10 ** 12] for name in sections}
+        header_len = len(json.dumps(header).encode("utf-8"))
+
+        body = bytearray()
+        base = len(MAGIC) + _HEADER_LEN.size + header_len
+        base += -base % 4
+        for name, data in (("severity", bytes(severity)), ("record", record.tobytes()),
+                           ("offsets", offsets.tobytes()), ("neighbors", neighbors.tobytes())):
+            sections[name] = [base + len(body), base + len(body) + len(data)]
+            body.extend(data)
+            _pad4(body)
+        header["sections"] = sections
+        header_bytes = json.dumps(header).encode("utf-8").ljust(header_len)
+
+        out = bytearray(MAGIC)
+        out.extend(_HEADER_LEN.pack(header_len))
+        out.extend(header_bytes)
+        _pad4(out)
+        out.extend(body)
+
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(out)
+        os.replace(tmp_path, path)
+
+        return {
+            "drugs": n,
+            "pairs": sum(len(linked) for linked in adjacency) // 2,
+            "records": len(records),
+            "descriptions": len(interned["descriptions"]),
+            "bytes": len(out),
+        }
+
+    def load(self, path: str = None) -> bool:
+        """Map the artifact if it exists; returns whether a matrix is now loaded."""
+        path = path or self.PATH
+        self._path = path
+        if not os.path.exists(path):
+            return False
+        try:
+            loaded = _MatrixFile(path)
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Interaction matrix not loaded: {e}")
+            return False
+        with self._lock:
+            self._file = loaded
+            self._recheck = True
+        return True
+
+    def invalidate(self):
+        """Re-check the artifact against the table on the next lookup. Called after ingestion commits."""
+        self._recheck = True
+
+    def is_current(self, db: Session = None) -> bool:
+        """
+        Whether the loaded artifact still matches the `interactions` table (throttled check).
+        Each check also re-maps the artifact if the file was rebuilt since it was loaded.
+        """
+        if not self._recheck and time.monotonic() - self._last_check < self.REFRESH_INTERVAL:
+            return self._current
+        self._reload_if_rebuilt()
+        self._recheck = False
+        self._last_check = time.monotonic()
+
+        matrix = self._file
+        if matrix is None:
+            self._current = False
+            return False
+
+        own_session = db is None
+        if own_session:
+            db = ReadSessionLocal()
+        try:
+            fingerprint = interactions_fingerprint(db)
+        finally:
+            if own_session:
+                db.close()
+
+        current = fingerprint == matrix.fingerprint
+        if self._current and not current:
+            print("Interaction matrix is out of date; run build_interaction_matrix.py to rebuild it")
+        self._current = current
+        return current
+
+    def _reload_if_rebuilt(self):
+        try:
+            mtime = os.stat(self._path).st_mtime_ns
+        except OSError:
+            return  # Missing (or being replaced): keep whatever is mapped
+        if self._file is None or mtime != self._file.mtime:
+            self.load(self._path)
+
+    def _record(self, matrix: _MatrixFile, i: int, j: int):
+        if i > j:
+            i, j = j, i
+        packed = matrix.record[_cell(len(matrix.rxcuis), i, j)]
+        if not packed:
+            return None
+        # Keep the pair in the orientation it was stored with, like the in-memory index
+        d1, d2 = (matrix.rxcuis[j], matrix.rxcuis[i]) if packed & 1 else (matrix.rxcuis[i], matrix.rxcuis[j])
+        return InteractionRecord(d1, d2, *matrix.records[packed >> 1])
+
+    def get(self, id1: str, id2: str):
+        matrix = self._file
+        i, j = matrix.ids.get(id1), matrix.ids.get(id2)
+        if i is None or j is None or i == j:
+            return None
+        return self._record(matrix, i, j)
+
+    def severity_code(self, id1: str, id2: str) -> int:
+        """Severity rank of the pair (models.SEVERITY_RANK scale, 0 when none)."""
+        matrix = self._file
+        i, j = matrix.ids.get(id1), matrix.ids.get(id2)
+        if i is None or j is None or i == j:
+            return 0
+        if i > j:
+            i, j = j, i
+        return matrix.severity[_cell(len(matrix.rxcuis), i, j)]
+
+    def lookup_many(self, rxcui_list: list[str]) -> dict:
+        """Return {canonical_pair: InteractionRecord} for every interacting pair in the list."""
+        matrix = self._file
+        dense = sorted({matrix.ids[r] for r in rxcui_list if r in matrix.ids})
+        n, cells = len(matrix.rxcuis), matrix.record
+        found = {}
+        for a, i in enumerate(dense):
+            row = _cell(n, i, i + 1) - (i + 1)  # cell of (i, j) is row + j
+            for j in dense[a + 1:]:
+                if cells[row + j]:
+                    found[(matrix.rxcuis[i], matrix.rxcuis[j])] = self._record(matrix, i, j)
+        return found
+
+    def interactions_for(self, rxcui: str) -> list:
+        """Every recorded interaction involving `rxcui`, read from its neighbor list."""
+        matrix = self._file
+        i = matrix.ids.get(rxcui)
+        if i is None:
+            return []
+        return [self._record(matrix, i, j) for j in matrix.neighbors[matrix.offsets[i]:matrix.offsets[i + 1]]]
+
+    def stats(self) -> dict:
+        matrix = self._file
+        if matrix is None:
+            return {"loaded": False, "path": self.PATH}
+        return {
+            "loaded": True,
+            "path": matrix.path,
+            "current": self._current,
+            "built_at": matrix.built_at,
+            "drugs": len(matrix.rxcuis),
+            "pairs": len(matrix.neighbors) // 2,
+            "records": len(matrix.records) - 1,
+            "bytes": len(matrix._mm),
+        }
+
+interaction_matrix = InteractionMatrix()
@@ -1,85 +1,398 @@
+import asyncio
+import os
 from sqlalchemy.orm import Session
-from ..models import Interaction, Drug
+from ..database import ReadSessionLocal
+from ..models import Interaction, Drug, make_pair_key, severity_rank
 
+from .async_io import run_io
+from .check_cache import check_cache
+from .condition_service import condition_interaction_service
+from .food_interaction_service import food_interaction_service
+from .interaction_index import interaction_index
+from .interaction_matrix import interaction_matrix
+from .metrics import metrics
 from .openfda_service import openfda_service
 from .rxnav_service import rxnav_service
 
 class InteractionService:
+    # Batch checks are offline jobs: give the OpenFDA fan-out more time than a single check
+    BATCH_OPENFDA_DEADLINE = float(os.getenv("BATCH_OPENFDA_DEADLINE", "120"))
+    SQL_CHUNK_SIZE = 500  # Pair keys per IN (...) query
+
     def check_interactions(self, rxcui_list: list[str], db: Session):
         """
         Check for interactions between any pair of drugs in the list.
         """
+        # Fetch every local interaction among the listed drugs in a single query,
+        # then match pairs in memory instead of one round trip per pair
+        with metrics.stage("check.local_interactions"):
+            local_index = self._fetch_local_interactions(rxcui_list, db)
+
+        # Resolve every drug name once (cached) rather than twice per pair
+        with metrics.stage("check.names"):
+            names = rxnav_service.get_names(rxcui_list, db)
+
+        # Fan out all OpenFDA pair queries at once (bounded pool + per-check deadline)
+        with metrics.stage("check.openfda"):
+            fda_by_pair = openfda_service.get_adverse_events_bulk(self._fda_queries(rxcui_list, names))
+        with metrics.stage("check.merge"):
+            return self._build_response(rxcui_list, local_index, names, fda_by_pair)
+
+    async def check_all_async(self, rxcui_list: list[str], conditions: list[str] = None) -> dict:
+        """
+        Full /api/check_interactions pipeline (drug-drug, food and condition checks) as coroutines.
+        Local lookups and name resolution run concurrently; once names are known the OpenFDA
+        fan-out and the food/condition matching overlap. Blocking calls go to the async I/O
+        pool with their own sessions, so no request thread is held while upstreams respond.
+        """
+        names, local_index, fda_by_pair, food_interactions, condition_interactions = \
+            await self._resolve_all_async(rxcui_list, conditions)
+
+        with metrics.stage("check.merge"):
+            response = self._build_response(rxcui_list, local_index, names, fda_by_pair)
+        response["food_interactions"] = food_interactions
+        response["condition_interactions"] = condition_interactions
+        return response
+
+    async def check_cached_async(self, rxcui_list: list[str], conditions: list[str] = None) -> dict:
+        """
+        check_all_async, reusing the resolved names, local interactions and OpenFDA results of
+        an earlier check of the same drugs (any order, any conditions) from check_cache.
+        """
+        entry = await run_io(check_cache.get, rxcui_list)
+        if entry is not None:
+            names, local_index, fda_shared = entry
+            with metrics.stage("check.merge"):
+                return self._assemble_response(rxcui_list, conditions, names, local_index, fda_shared, {}, {})
+
+        generation = check_cache.generation
+        names, local_index, fda_by_pair, food_interactions, condition_interactions = \
+            await self._resolve_all_async(rxcui_list, conditions)
+        fda_shared = {self._pair_key(id1, id2): result for (id1, id2), result in fda_by_pair.items()}
+        check_cache.put(generation, rxcui_list, names, local_index, fda_shared)
+
+        with metrics.stage("check.merge"):
+            response = self._build_response(rxcui_list, local_index, names, fda_by_pair)
+        response["food_interactions"] = food_interactions
+        response["condition_interactions"] = condition_interactions
+        return response
+
+    async def _resolve_all_async(self, rxcui_list: list[str], conditions: list[str]):
+        """(names, local_index, fda_by_pair, food_interactions, condition_interactions) for a list."""
+        local_task = asyncio.ensure_future(
+            self._timed_io("check.local_interactions", self._with_session, self._fetch_local_interactions, rxcui_list)
+        )
+        names = await self._timed_io("check.names", self._with_session, rxnav_service.get_names, rxcui_list)
+
+        fda_task = asyncio.ensure_future(
+            self._timed_io_async("check.openfda",
+                                 openfda_service.get_adverse_events_bulk_async(self._fda_queries(rxcui_list, names)))
+        )
+        drug_names = [names[rxcui] for rxcui in rxcui_list if names.get(rxcui)]
+        food_interactions, condition_interactions = await asyncio.gather(
+            self._timed_io("check.food_rules", food_interaction_service.check_food_interactions, drug_names),
+            self._timed_io("check.condition_rules", condition_interaction_service.check_condition_interactions,
+                           drug_names, conditions or []),
+        )
+        local_index, fda_by_pair = await asyncio.gather(local_task, fda_task)
+        return names, local_index, fda_by_pair, food_interactions, condition_interactions
+
+    async def _timed_io(self, stage: str, func, *args):
+        # Timed inside the pool thread: excludes time spent queued for a free worker
+        return await run_io(self._timed, stage, func, *args)
+
+    async def _timed_io_async(self, stage: str, awaitable):
+        with metrics.stage(stage):
+            return await awaitable
+
+    def _timed(self, stage: str, func, *args):
+        with metrics.stage(stage):
+            return func(*args)
+
+    def check_batch(self, checks: list, db: Session):
+        """
+        Check many medication lists at once. `checks` is a list of (rxcuis, conditions).
+        Names, local interactions, OpenFDA signals and food/condition rules are resolved once
+        for the union of drugs and pairs across the batch, so the cost scales with unique
+        pairs rather than with the number of lists.
+        Returns (summary, iterator of per-list responses in input order); the iterator only
+        merges already-resolved data and needs no session.
+        """
+        unique_ids = list(dict.fromkeys(rxcui for rxcuis, _ in checks for rxcui in rxcuis))
+        unique_pairs = {
+            self._pair_key(rxcuis[i], rxcuis[j])
+            for rxcuis, _ in checks
+            for i in range(len(rxcuis))
+            for j in range(i + 1, len(rxcuis))
+        }
+
+        with metrics.stage("check.names"):
+            names = rxnav_service.get_names(unique_ids, db)
+        local_index, fda_shared, fda_queries = self._resolve_pairs(
+            unique_pairs, names, db, deadline=self.BATCH_OPENFDA_DEADLINE
+        )
+
+        summary = {
+            "checks": len(checks),
+            "unique_drugs": len(unique_ids),
+            "unique_pairs": len(unique_pairs),
+            "openfda_queries": fda_queries,
+        }
+        return summary, self._iter_batch_results(checks, names, local_index, fda_shared)
+
+    def _iter_batch_results(self, checks: list, names: dict, local_index: dict, fda_shared: dict):
+        food_by_drug = {}
+        condition_by_drug = {}
+        for rxcuis, conditions in checks:
+            yield self._assemble_response(
+                rxcuis, conditions, names, local_index, fda_shared, food_by_drug, condition_by_drug
+            )
+
+    def _resolve_pairs(self, pairs: set, names: dict, db: Session, deadline: float = None):
+        """
+        Local interactions and OpenFDA signals for a set of canonical pairs.
+        Returns (local_index, {canonical pair: OpenFDA result}, number of OpenFDA queries).
+        """
+        with metrics.stage("check.local_interactions"):
+            local_index = self._fetch_local_pairs(pairs, db)
+        fda_queries = [
+            (names[id1], names[id2], id1, id2)
+            for id1, id2 in sorted(pairs)
+            if names.get(id1) and names.get(id2)
+        ]
+        with metrics.stage("check.openfda"):
+            fda_shared = openfda_service.get_adverse_events_bulk(fda_queries, deadline=deadline)
+        return local_index, fda_shared, len(fda_queries)
+
+    async def _resolve_pairs_async(self, pairs: set, names: dict):
+        """
+        _resolve_pairs on the async pipeline: the local lookup runs on the I/O pool while
+        the OpenFDA fan-out is awaited. Returns (local_index, {canonical pair: OpenFDA result}).
+        """
+        local_task = asyncio.ensure_future(
+            self._timed_io("check.local_interactions", self._with_session, self._fetch_local_pairs, pairs)
+        )
+        fda_queries = [
+            (names[id1], names[id2], id1, id2)
+            for id1, id2 in sorted(pairs)
+            if names.get(id1) and names.get(id2)
+        ]
+        fda_shared = await self._timed_io_async("check.openfda", openfda_service.get_adverse_events_bulk_async(fda_queries))
+        return await local_task, fda_shared
+
+    def _assemble_response(self, rxcuis: list[str], conditions: list[str], names: dict, local_index: dict,
+                           fda_shared: dict, food_by_drug: dict, condition_by_drug: dict) -> dict:
+        """
+        Full check response for one list from already-resolved data (canonical-pair OpenFDA
+        results; food/condition matches memoized per drug and per (drug, condition)).
+        """
+        # Per-list view of the shared OpenFDA results, in this list's pair orientation
+        fda_by_pair = {}
+        for i, id1 in enumerate(rxcuis):
+            for id2 in rxcuis[i + 1:]:
+                key = self._pair_key(id1, id2)
+                if key in fda_shared:
+                    fda_by_pair[(id1, id2)] = fda_shared[key]
+
+        response = self._build_response(rxcuis, local_index, names, fda_by_pair)
+
+        drug_names = [names[rxcui] for rxcui in rxcuis if names.get(rxcui)]
+        food_interactions = []
+        for name in drug_names:
+            if name not in food_by_drug:
+                food_by_drug[name] = food_interaction_service.check_food_interactions([name])
+            food_interactions.extend(food_by_drug[name])
+        condition_interactions = []
+        for condition in conditions or []:
+            for name in drug_names:
+                key = (name, condition)
+                if key not in condition_by_drug:
+                    condition_by_drug[key] = condition_interaction_service.check_condition_interactions([name], [condition])
+                condition_interactions.extend(condition_by_drug[key])
+
+        response["food_interactions"] = food_interactions
+        response["condition_interactions"] = condition_interactions
+        return response
+
+    def _with_session(self, func, *args):
+        """Call func(*args, db) with a short-lived read-only session (for work run on the async I/O pool)."""
+        db = ReadSessionLocal()
+        try:
+            return func(*args, db)
+        finally:
+            db.close()
+
+    def _fda_queries(self, rxcui_list: list[str], names: dict) -> list:
+        """
+        One OpenFDA query per pair. Pass both names and IDs for maximum accuracy;
+        pairs with unresolved names are skipped.
+        """
+        return [
+            (names[id1], names[id2], id1, id2)
+            for i, id1 in enumerate(rxcui_list)
+            for id2 in rxcui_list[i + 1:]
+            if names.get(id1) and names.get(id2)
+        ]
+
+    def _build_response(self, rxcui_list: list[str], local_index: dict, names: dict, fda_by_pair: dict) -> dict:
+        """Merge local and OpenFDA findings for every pair into the check response."""
         interactions_found = []
-        
-        # Simple O(N^2) check for now, sufficient for small lists
-        for i in range(len(rxcui_list)):
-            for j in range(i + 1, len(rxcui_list)):
-                id1 = rxcui_list[i]
-                id2 = rxcui_list[j]
-                
-                # 1. Check Local DB
-                local_results = []
-                interaction = db.query(Interaction).filter(
-                    ((Interaction.drug_1_rxcui == id1) & (Interaction.drug_2_rxcui == id2)) |
-                    ((Interaction.drug_1_rxcui == id2) & (Interaction.drug_2_rxcui == id1))
-                ).first()
-                
-                if interaction:
-                    local_results.append({
-                        "severity": interaction.severity,
-                        "description": interaction.description,
-                        "color": self._get_color(interaction.severity),
-                        "source": "Local DB"
-                    })
-
-                # 2. Check OpenFDA (Always check for verification)
-                fda_results = []
-                name1 = rxnav_service.get_name(id1)
-                name2 = rxnav_service.get_name(id2)
-                
-                # Even if names fail, we can now try with just IDs if OpenFDA supports it (implemented in service)
-                # But our current service logic relies on names being present for the initial part of query, 
-                # actually I made them optional in query construction (drug1_rxcui: str = None), 
-                # but the method signature still requires name str. 
-                # Let's pass what we have.
-                
-                if name1 and name2:
-                    # Pass both names and IDs for maximum accuracy
-                    fda_result = openfda_service.get_adverse_events(name1, name2, id1, id2)
-                    
-                    if fda_result.get('found') and fda_result.get('risk_score', 0) > 10:
-                        fda_results.append({
-                            "severity": "Potential Risk",
-                            "description": f"OpenFDA reports: {', '.join([r['term'] for r in fda_result['top_reactions'][:3]])}",
-                            "color": "yellow",
-                            "source": "OpenFDA (Live)"
-                        })
-
-                # 3. Consensus / Merge Logic
-                if local_results:
-                    # Trust Local DB for Color/Severity, but append FDA info
-                    primary = local_results[0]
-                    if fda_results:
-                        primary["description"] += f" | {fda_results[0]['description']}"
-                        primary["multi_source_verified"] = True
-                    interactions_found.append({
-                        "drug_1": id1,
-                        "drug_2": id2,
-                        "drug1": name1 or id1,
-                        "drug2": name2 or id2,
-                        **primary
-                    })
-                elif fda_results:
-                     # Only FDA found it using fallback
-                    interactions_found.append({
-                        "drug_1": id1,
-                        "drug_2": id2,
-                        "drug1": name1 or id1,
-                        "drug2": name2 or id2,
-                        **fda_results[0]
-                    })
-
-        return {"interactions": interactions_found}
+
+        pairs = [
+            (rxcui_list[i], rxcui_list[j])
+            for i in range(len(rxcui_list))
+            for j in range(i + 1, len(rxcui_list))
+        ]
+
+        fda_timed_out = sum(1 for r in fda_by_pair.values() if r.get('timed_out'))
+        fda_unavailable = sum(1 for r in fda_by_pair.values() if r.get('unavailable'))
+
+        for id1, id2 in pairs:
+            name1 = names.get(id1)
+            name2 = names.get(id2)
+
+            # 1. Check Local DB (in-memory match against the batch result)
+            local_results = []
+            interaction = local_index.get(self._pair_key(id1, id2))
+            
+            if interaction:
+                local_results.append({
+                    "severity": interaction.severity,
+                    "description": interaction.description,
+                    "color": self._get_color(interaction.severity),
+                    "source": "Local DB"
+                })
+
+            # 2. Check OpenFDA (Always check for verification)
+            fda_results = []
+            fda_result = fda_by_pair.get((id1, id2), {})
+            
+            if fda_result.get('found') and fda_result.get('risk_score', 0) > 10:
+                fda_results.append({
+                    "severity": "Potential Risk",
+                    "description": f"OpenFDA reports: {', '.join([r['term'] for r in fda_result['top_reactions'][:3]])}",
+                    "color": "yellow",
+                    "source": "OpenFDA (Live)"
+                })
+
+            # 3. Consensus / Merge Logic
+            if local_results:
+                # Trust Local DB for Color/Severity, but append FDA info
+                primary = local_results[0]
+                if fda_results:
+                    primary["description"] += f" | {fda_results[0]['description']}"
+                    primary["multi_source_verified"] = True
+                interactions_found.append({
+                    "drug_1": id1,
+                    "drug_2": id2,
+                    "drug1": name1 or id1,
+                    "drug2": name2 or id2,
+                    **primary
+                })
+            elif fda_results:
+                 # Only FDA found it using fallback
+                interactions_found.append({
+                    "drug_1": id1,
+                    "drug_2": id2,
+                    "drug1": name1 or id1,
+                    "drug2": name2 or id2,
+                    **fda_results[0]
+                })
+
+        response = {"interactions": interactions_found}
+        if fda_timed_out:
+            # Deadline hit: results are partial for the pairs OpenFDA didn't answer in time
+            response["openfda_partial"] = True
+            response["openfda_pending_pairs"] = fda_timed_out
+        if fda_unavailable:
+            # Circuit breaker open: those pairs were answered from local data only
+            response["openfda_unavailable"] = True
+        return response
+
+    def _pair_key(self, id1: str, id2: str) -> tuple:
+        """Order-independent key for a drug pair."""
+        return (id1, id2) if id1 <= id2 else (id2, id1)
+
+    def _fetch_local_interactions(self, rxcui_list: list[str], db: Session) -> dict:
+        """
+        Load all interactions among the given RxCUIs and index them by pair.
+        Uses the precomputed matrix or the in-memory interaction index when loaded,
+        otherwise one SQL query.
+        """
+        # Fastest path: array probes into the memory-mapped matrix, while it matches the table
+        if interaction_matrix.is_current(db):
+            return interaction_matrix.lookup_many(rxcui_list)
+
+        # Fast path: dict probes against the in-memory index built at startup
+        if interaction_index.is_loaded:
+            interaction_index.ensure_fresh(db)
+            return interaction_index.lookup_many(rxcui_list)
+
+        unique_ids = sorted(set(rxcui_list))
+        if len(unique_ids) < 2:
+            return {}
+
+        # One unique-index seek per pair on the canonical pair key
+        pair_keys = [
+            make_pair_key(unique_ids[i], unique_ids[j])
+            for i in range(len(unique_ids))
+            for j in range(i + 1, len(unique_ids))
+        ]
+        rows = db.query(Interaction).filter(Interaction.pair_key.in_(pair_keys)).all()
+
+        index = {}
+        for row in rows:
+            index.setdefault(self._pair_key(row.drug_1_rxcui, row.drug_2_rxcui), row)
+        return index
+
+    def _fetch_local_pairs(self, pairs: set, db: Session) -> dict:
+        """Like _fetch_local_interactions, but for an explicit set of canonical pairs."""
+        source = None
+        if interaction_matrix.is_current(db):
+            source = interaction_matrix
+        elif interaction_index.is_loaded:
+            interaction_index.ensure_fresh(db)
+            source = interaction_index
+        if source is not None:
+            found = {}
+            for id1, id2 in pairs:
+                record = source.get(id1, id2)
+                if record is not None:
+                    found[(id1, id2)] = record
+            return found
+
+        pair_keys = [make_pair_key(id1, id2) for id1, id2 in pairs]
+        index = {}
+        for start in range(0, len(pair_keys), self.SQL_CHUNK_SIZE):
+            chunk = pair_keys[start:start + self.SQL_CHUNK_SIZE]
+            for row in db.query(Interaction).filter(Interaction.pair_key.in_(chunk)):
+                index.setdefault(self._pair_key(row.drug_1_rxcui, row.drug_2_rxcui), row)
+        return index
+
+    def interactions_for(self, rxcui: str, db: Session) -> list:
+        """Every known interaction of one drug, most severe first (no SQL when an index is loaded)."""
+        if interaction_matrix.is_current(db):
+            records = interaction_matrix.interactions_for(rxcui)
+        elif interaction_index.is_loaded:
+            interaction_index.ensure_fresh(db)
+            records = [interaction_index.get(rxcui, other) for other in interaction_index.neighbors(rxcui)]
+        else:
+            records = db.query(Interaction).filter(
+                (Interaction.drug_1_rxcui == rxcui) | (Interaction.drug_2_rxcui == rxcui)
+            ).all()
+
+        found = []
+        for record in records:
+            other = record.drug_2_rxcui if record.drug_1_rxcui == rxcui else record.drug_1_rxcui
+            found.append({
+                "rxcui": other,
+                "severity": record.severity,
+                "description": record.description,
+                "color": self._get_color(record.severity),
+                "source": record.source,
+            })
+        found.sort(key=lambda f: (-severity_rank(f["severity"]), f["rxcui"]))
+        return found
 
     def _get_color(self, severity):
         severity = severity.lower()
@@ -97,7 +410,7 @@ class InteractionService:
         # Warfarin RxCUI: 11289
         # Aspirin RxCUI: 1191
         
-        if not db.query(Interaction).filter_by(drug_1_rxcui="11289", drug_2_rxcui="1191").first():
+        if not db.query(Interaction).filter_by(pair_key=make_pair_key("11289", "1191")).first():
             db.add(Interaction(
                 drug_1_rxcui="11289", 
                 drug_2_rxcui="1191", 
@@ -107,7 +420,7 @@ class InteractionService:
             ))
             
         # Example 2: Sildenafil (10598) + Nitroglycerin (7646) -> Fatal hypotension
-        if not db.query(Interaction).filter_by(drug_1_rxcui="10598", drug_2_rxcui="7646").first():
+        if not db.query(Interaction).filter_by(pair_key=make_pair_key("10598", "7646")).first():
             db.add(Interaction(
                 drug_1_rxcui="10598", 
                 drug_2_rxcui="7646", 
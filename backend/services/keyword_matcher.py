@@ -0,0 +1,68 @@
+from collections import deque
+
+
+class KeywordMatcher:
+    """
+    Aho–Corasick automaton over many keywords, compiled once.
+    `find(text)` scans the text in a single pass regardless of how many keywords exist,
+    and only reports whole-word matches ("omeprazole" does not match inside "esomeprazole").
+    """
+
+    def __init__(self, patterns):
+        """`patterns` is an iterable of (keyword, payload); keywords are matched case-insensitively."""
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [[]]  # state -> [(keyword_length, keyword, payload)]
+        self.size = 0
+
+        for keyword, payload in patterns:
+            keyword = keyword.strip().lower()
+            if keyword:
+                self._add(keyword, payload)
+                self.size += 1
+        self._build_failure_links()
+
+    def _add(self, keyword: str, payload):
+        state = 0
+        for char in keyword:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+                self._goto[state][char] = next_state
+            state = next_state
+        self._output[state].append((len(keyword), keyword, payload))
+
+    def _build_failure_links(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(char, 0)
+                self._fail[next_state] = target if target != next_state else 0
+                self._output[next_state] = self._output[next_state] + self._output[self._fail[next_state]]
+
+    def find(self, text: str) -> list:
+        """Return [(keyword, payload)] for every whole-word match, in order of appearance."""
+        text = text.lower()
+        matches = []
+        state = 0
+        for end, char in enumerate(text):
+            while state and char not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(char, 0)
+            for length, keyword, payload in self._output[state]:
+                start = end - length + 1
+                if self._is_boundary(text, start - 1) and self._is_boundary(text, end + 1):
+                    matches.append((keyword, payload))
+        return matches
+
+    @staticmethod
+    def _is_boundary(text: str, index: int) -> bool:
+        return index < 0 or index >= len(text) or not text[index].isalnum()
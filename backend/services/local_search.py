@@ -0,0 +1,245 @@
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from sqlalchemy import func, text
+from sqlalchemy.orm import Session
+from ..database import SessionLocal, ReadSessionLocal
+from ..models import Drug, EgyptianDrug
+from .arabic_index import normalize_arabic
+
+FTS_TABLE = "drug_search_fts"
+TRIGRAM_TABLE = "drug_search"
+
+# Created by migrations.run_migrations (SQLite only)
+FTS_DDL = (
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+    "rxcui UNINDEXED, name, synonyms, trade_name_en, trade_name_ar, generic_name, "
+    "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+)
+
+# PostgreSQL: same rows in a plain table, searched through one pg_trgm index over all columns
+# (created by migrations.run_migrations; without pg_trgm the table is scanned with LIKE)
+TRIGRAM_DOCUMENT = "lower(name || ' ' || synonyms || ' ' || trade_name_en || ' ' || trade_name_ar || ' ' || generic_name)"
+TRIGRAM_TABLE_DDL = (
+    f"CREATE TABLE IF NOT EXISTS {TRIGRAM_TABLE} ("
+    "rxcui VARCHAR NOT NULL, name VARCHAR NOT NULL, synonyms TEXT NOT NULL, trade_name_en VARCHAR NOT NULL, "
+    "trade_name_ar VARCHAR NOT NULL, generic_name VARCHAR NOT NULL)"
+)
+TRIGRAM_INDEX_DDL = (
+    f"CREATE INDEX IF NOT EXISTS ix_{TRIGRAM_TABLE}_trgm ON {TRIGRAM_TABLE} USING gin (({TRIGRAM_DOCUMENT}) gin_trgm_ops)"
+)
+
+_TOKEN = re.compile(r"[0-9A-Za-z\u0600-\u06FF]+")
+
+# Result scores: the whole query equals a name; every query token is a whole word of the
+# entry; prefix matches only
+EXACT_SCORE = 100
+WORD_SCORE = 95
+PREFIX_SCORE = 90
+
+
+class LocalDrugSearch:
+    """
+    Full-text drug search over `drugs` (RxNorm names/synonyms) and `egyptian_drugs`
+    (English/Arabic trade names, generic names) using an SQLite FTS5 index, or a pg_trgm
+    index on PostgreSQL. Every query token is a prefix match, so partial typeahead input works.
+    Only rows that resolve to an RxCUI are indexed, since results feed interaction checks.
+
+    Rebuilds triggered from searches run on a background writer; the current index keeps
+    serving meanwhile, so a search never waits on the write lock (e.g. during ingest_data.py).
+    """
+    REFRESH_INTERVAL = float(os.getenv("LOCAL_SEARCH_REFRESH_SECONDS", "60"))
+
+    def __init__(self):
+        self._stale = True
+        self._fingerprint = None
+        self._last_check = 0.0
+        self._has_trigram = None  # PostgreSQL: pg_trgm installed (checked on first search)
+        self._lock = threading.Lock()
+        self._rebuild_scheduled = False
+        self._schedule_lock = threading.Lock()
+        self._rebuilder = ThreadPoolExecutor(max_workers=1, thread_name_prefix="local-search-rebuild")
+
+    def invalidate(self):
+        self._stale = True
+
+    def available(self, db: Session) -> bool:
+        return db.get_bind().dialect.name in ("sqlite", "postgresql")
+
+    def _table(self, db: Session) -> str:
+        return FTS_TABLE if db.get_bind().dialect.name == "sqlite" else TRIGRAM_TABLE
+
+    def rebuild(self, db: Session = None) -> int:
+        """Repopulate the FTS table from `drugs` and `egyptian_drugs`."""
+        from .rxnav_service import RxNavService
+
+        own_session = db is None
+        if own_session:
+            db = SessionLocal()
+        try:
+            if not self.available(db):
+                return 0
+            with self._lock:
+                # Read first: a write landing mid-rebuild then shows up as a change on the next check
+                fingerprint = self._table_fingerprint(db)
+                drugs = db.query(Drug.rxcui, Drug.name, Drug.synonyms).all()
+                rxcui_by_name = {name.lower(): rxcui for rxcui, name, _ in drugs if name}
+                name_by_rxcui = {rxcui: name for rxcui, name, _ in drugs if name}
+
+                # Generic names that differ from RxNorm names (e.g. Paracetamol -> Acetaminophen)
+                for generic, aliases in RxNavService.DRUG_SYNONYMS.items():
+                    for alias in [generic] + aliases:
+                        if alias in rxcui_by_name:
+                            rxcui_by_name.setdefault(generic, rxcui_by_name[alias])
+                            break
+
+                rows = [
+                    {"rxcui": rxcui, "name": name, "synonyms": synonyms or "",
+                     "trade_name_en": "", "trade_name_ar": "", "generic_name": ""}
+                    for rxcui, name, synonyms in drugs if name
+                ]
+                for trade_en, trade_ar, generic in db.query(
+                    EgyptianDrug.trade_name_en, EgyptianDrug.trade_name_ar, EgyptianDrug.generic_name
+                ):
+                    rxcui = rxcui_by_name.get((generic or "").strip().lower())
+                    if not rxcui:
+                        continue
+                    rows.append({"rxcui": rxcui, "name": name_by_rxcui[rxcui], "synonyms": "",
+                                 "trade_name_en": trade_en or "",
+                                 "trade_name_ar": normalize_arabic(trade_ar or ""),
+                                 "generic_name": generic or ""})
+
+                table = self._table(db)
+                db.execute(text(f"DELETE FROM {table}"))
+                if rows:
+                    db.execute(text(
+                        f"INSERT INTO {table} (rxcui, name, synonyms, trade_name_en, trade_name_ar, generic_name) "
+                        "VALUES (:rxcui, :name, :synonyms, :trade_name_en, :trade_name_ar, :generic_name)"
+                    ), rows)
+                db.commit()
+
+                self._fingerprint = fingerprint
+                self._stale = False
+                self._last_check = time.monotonic()
+                return len(rows)
+        except Exception as e:
+            db.rollback()
+            print(f"Local search index rebuild failed: {e}")
+            return 0
+        finally:
+            if own_session:
+                db.close()
+
+    def ensure_fresh(self, db: Session):
+        """Schedule a rebuild if invalidated or the source tables changed (throttled check)."""
+        if not self._stale:
+            if time.monotonic() - self._last_check < self.REFRESH_INTERVAL:
+                return
+            self._last_check = time.monotonic()
+            if self._table_fingerprint(db) == self._fingerprint:
+                return
+            self._stale = True  # Stays set if the rebuild fails, so the next search retries
+        with self._schedule_lock:
+            if self._rebuild_scheduled:
+                return
+            self._rebuild_scheduled = True
+        self._rebuilder.submit(self._rebuild_scheduled_index)
+
+    def _rebuild_scheduled_index(self):
+        try:
+            self.rebuild()  # Own (writable) session
+        finally:
+            with self._schedule_lock:
+                self._rebuild_scheduled = False
+
+    def flush(self):
+        """Wait for a scheduled rebuild to finish."""
+        self._rebuilder.submit(lambda: None).result()
+
+    def search(self, query: str, limit: int = 15, db: Session = None) -> list:
+        """
+        Return [{"rxcui", "name", "score", "synonyms"}] best first, one entry per RxCUI.
+        Same shape as RxNav search results.
+        """
+        tokens = _TOKEN.findall(normalize_arabic(query))
+        if not tokens:
+            return []
+
+        own_session = db is None
+        if own_session:
+            db = ReadSessionLocal()
+        try:
+            if not self.available(db):
+                return []
+            self.ensure_fresh(db)
+            if db.get_bind().dialect.name == "sqlite":
+                rows = self._match_fts(db, tokens, limit * 4)
+            else:
+                rows = self._match_trigram(db, tokens, limit * 4)
+        except Exception as e:
+            print(f"Local search error: {e}")
+            return []
+        finally:
+            if own_session:
+                db.close()
+
+        needle = normalize_arabic(query).lower()
+        words = {token.lower() for token in tokens}
+        results = {}
+        for rxcui, name, synonyms, trade_en, trade_ar, generic in rows:
+            if needle in (name.lower(), trade_en.lower(), generic.lower(), trade_ar):
+                score = EXACT_SCORE
+            elif words <= set(_TOKEN.findall(f"{name} {synonyms} {trade_en} {trade_ar} {generic}".lower())):
+                score = WORD_SCORE
+            else:
+                score = PREFIX_SCORE
+            entry = results.get(rxcui)
+            if entry is None:
+                entry = results[rxcui] = {
+                    "rxcui": rxcui,
+                    "name": name,
+                    "score": score,
+                    "synonyms": synonyms or "",
+                }
+            entry["score"] = max(entry["score"], score)
+            if trade_en:
+                # Surface matching Egyptian trade names as synonyms
+                trade = f"{trade_en} / {trade_ar}" if trade_ar else trade_en
+                if trade not in entry["synonyms"]:
+                    entry["synonyms"] = f"{entry['synonyms']}, {trade}" if entry["synonyms"] else trade
+
+        ranked = sorted(results.values(), key=lambda r: -r["score"])  # stable: bm25 order within a score
+        return ranked[:limit]
+
+    def _match_fts(self, db: Session, tokens: list, limit: int) -> list:
+        match = " ".join(f'"{token}"*' for token in tokens)
+        return db.execute(text(
+            f"SELECT rxcui, name, synonyms, trade_name_en, trade_name_ar, generic_name "
+            f"FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH :match ORDER BY bm25({FTS_TABLE}) LIMIT :limit"
+        ), {"match": match, "limit": limit}).all()
+
+    def _match_trigram(self, db: Session, tokens: list, limit: int) -> list:
+        # Word-prefix match per token (both LIKE forms can use the trigram index),
+        # ranked by how well the whole query matches a word sequence in the row
+        conditions = []
+        params = {"query": " ".join(tokens).lower(), "limit": limit}
+        for i, token in enumerate(tokens):
+            conditions.append(f"({TRIGRAM_DOCUMENT} LIKE :start{i} OR {TRIGRAM_DOCUMENT} LIKE :word{i})")
+            params[f"start{i}"] = f"{token.lower()}%"
+            params[f"word{i}"] = f"% {token.lower()}%"
+        if self._has_trigram is None:
+            self._has_trigram = db.execute(text("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")).first() is not None
+        order = f"word_similarity(:query, {TRIGRAM_DOCUMENT}) DESC" if self._has_trigram else "length(name)"
+        return db.execute(text(
+            f"SELECT rxcui, name, synonyms, trade_name_en, trade_name_ar, generic_name FROM {TRIGRAM_TABLE} "
+            f"WHERE {' AND '.join(conditions)} ORDER BY {order} LIMIT :limit"
+        ), params).all()
+
+    def _table_fingerprint(self, db: Session):
+        drugs = db.query(func.count(Drug.rxcui)).scalar()
+        egyptian = db.query(func.count(EgyptianDrug.id), func.max(EgyptianDrug.id)).one()
+        return (drugs,) + tuple(egyptian)
+
+local_search = LocalDrugSearch()
@@ -0,0 +1,191 @@
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+
+# Seconds; covers in-memory lookups (sub-millisecond) up to slow upstream fan-outs
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _label_text(names: tuple, values: tuple) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{str(value).replace(chr(34), chr(39))}"' for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str, labels: tuple = ()):
+        self.name = name
+        self.help = help_text
+        self.labels = labels
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount: float = 1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for label_values, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_label_text(self.labels, label_values)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, labels: tuple = (), buckets: tuple = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labels = labels
+        self.buckets = buckets
+        self._series = {}  # label values -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float, *label_values):
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    series[i] += 1
+                    break
+            series[-2] += seconds
+            series[-1] += 1
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for label_values, series in sorted(self._series.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets, series):
+                    cumulative += count
+                    labels = _label_text(self.labels + ("le",), label_values + (bound,))
+                    lines.append(f"{self.name}_bucket{labels} {cumulative}")
+                labels = _label_text(self.labels + ("le",), label_values + ("+Inf",))
+                lines.append(f"{self.name}_bucket{labels} {series[-1]}")
+                labels = _label_text(self.labels, label_values)
+                lines.append(f"{self.name}_sum{labels} {round(series[-2], 6)}")
+                lines.append(f"{self.name}_count{labels} {series[-1]}")
+        return lines
+
+
+class RequestTimings:
+    """Per-request breakdown: time per stage and counts of upstream calls, cache lookups and DB queries."""
+
+    def __init__(self):
+        self.stages = {}  # stage -> [seconds, calls]
+        self.counts = {}
+        self._lock = threading.Lock()
+
+    def add_stage(self, stage: str, seconds: float):
+        with self._lock:
+            entry = self.stages.setdefault(stage, [0.0, 0])
+            entry[0] += seconds
+            entry[1] += 1
+
+    def add_count(self, event: str, amount: int = 1):
+        with self._lock:
+            self.counts[event] = self.counts.get(event, 0) + amount
+
+    def server_timing(self, total: float) -> str:
+        """`Server-Timing` header value (durations in ms; counters as descriptions)."""
+        with self._lock:
+            parts = [f"total;dur={total * 1000:.1f}"]
+            for stage, (seconds, calls) in self.stages.items():
+                parts.append(f'{stage};dur={seconds * 1000:.1f};desc="{calls}x"')
+            for event, count in sorted(self.counts.items()):
+                parts.append(f'{event};desc="{count}"')
+        return ", ".join(parts)
+
+
+_current = contextvars.ContextVar("request_timings", default=None)
+
+
+class Metrics:
+    """
+    Process-wide Prometheus-style metrics for the check/search hot paths, plus the optional
+    per-request breakdown (Server-Timing header). Blocking work run on other threads keeps
+    reporting to its request as long as the context is copied (see async_io.run_io).
+    """
+
+    def __init__(self):
+        self.request_seconds = Histogram(
+            "drug_safety_http_request_seconds", "HTTP request latency by route.", ("method", "route", "status"))
+        self.stage_seconds = Histogram(
+            "drug_safety_stage_seconds", "Latency of each hot-path stage.", ("stage",))
+        self.upstream_seconds = Histogram(
+            "drug_safety_upstream_request_seconds", "Outbound RxNav/OpenFDA request latency.", ("host",))
+        self.upstream_requests = Counter(
+            "drug_safety_upstream_requests_total", "Outbound requests by host and status.", ("host", "status"))
+        self.cache_lookups = Counter(
+            "drug_safety_cache_lookups_total", "Cache lookups by cache and result (hit, stale, miss).", ("cache", "result"))
+        self.db_queries = Counter(
+            "drug_safety_db_queries_total", "SQL statements executed.")
+
+    # Per-request breakdown
+
+    def begin_request(self) -> contextvars.Token:
+        return _current.set(RequestTimings())
+
+    def end_request(self, token: contextvars.Token) -> RequestTimings:
+        timings = _current.get()
+        _current.reset(token)
+        return timings
+
+    def _count(self, event: str, amount: int = 1):
+        timings = _current.get()
+        if timings is not None:
+            timings.add_count(event, amount)
+
+    # Recording
+
+    @contextmanager
+    def stage(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe_stage(name, time.perf_counter() - start)
+
+    def observe_stage(self, name: str, seconds: float):
+        self.stage_seconds.observe(seconds, name)
+        timings = _current.get()
+        if timings is not None:
+            timings.add_stage(name, seconds)
+
+    def observe_request(self, method: str, route: str, status: int, seconds: float):
+        self.request_seconds.observe(seconds, method, route, str(status))
+
+    def upstream(self, host: str, status, seconds: float):
+        self.upstream_seconds.observe(seconds, host)
+        self.upstream_requests.inc(host, str(status))
+        self._count("upstream_calls")
+
+    def cache(self, cache: str, result: str, amount: int = 1):
+        if amount:
+            self.cache_lookups.inc(cache, result, amount=amount)
+            self._count(f"{cache}_{result}", amount)
+
+    def db_query(self):
+        self.db_queries.inc()
+        self._count("db_queries")
+
+    def instrument_engine(self, engine):
+        """Count every SQL statement executed through `engine`."""
+        from sqlalchemy import event
+
+        @event.listens_for(engine, "before_cursor_execute")
+        def _count_query(conn, cursor, statement, parameters, context, executemany):
+            self.db_query()
+
+    def render(self) -> str:
+        lines = []
+        for metric in (self.request_seconds, self.stage_seconds, self.upstream_seconds,
+                       self.upstream_requests, self.cache_lookups, self.db_queries):
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+metrics = Metrics()
@@ -0,0 +1,163 @@
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from ..database import SessionLocal, ReadSessionLocal
+from ..models import AdverseEventSignal
+
+
+class OpenFDACache:
+    """
+    Persistent cache of OpenFDA adverse-event results, stored in the main SQLite DB
+    and keyed by the normalized unordered drug pair.
+
+    - Fresh entries (younger than TTL) are served directly.
+    - Stale entries (younger than STALE_TTL) are served while a refresh runs in the background.
+    - In OFFLINE mode only the snapshot is used and OpenFDA is never called.
+    - New results are written behind by one background writer, so checks never wait on the
+      SQLite write lock (e.g. while an ingestion job holds it); unwritten results are
+      still served from memory.
+    """
+    TTL = float(os.getenv("OPENFDA_CACHE_TTL", str(7 * 24 * 3600)))
+    STALE_TTL = float(os.getenv("OPENFDA_CACHE_STALE_TTL", str(30 * 24 * 3600)))
+    OFFLINE = os.getenv("OPENFDA_OFFLINE", "0") == "1"
+    WRITE_BEHIND = os.getenv("OPENFDA_CACHE_WRITE_BEHIND", "1") == "1"
+
+    def __init__(self):
+        self._pending = {}  # pair_key -> (result, fetched_at) not yet written
+        self._pending_lock = threading.Lock()
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="openfda-cache-writer")
+
+    def pair_key(self, drug1_name: str, drug2_name: str, drug1_rxcui: str = None, drug2_rxcui: str = None) -> str:
+        """Prefer RxCUIs, fall back to lowercased names; order-independent."""
+        a = drug1_rxcui or (drug1_name or "").strip().lower()
+        b = drug2_rxcui or (drug2_name or "").strip().lower()
+        return f"{a}|{b}" if a <= b else f"{b}|{a}"
+
+    def get_many(self, keys: list[str]) -> dict:
+        """Return {pair_key: (result, age_seconds)} for every cached key, in one query."""
+        if not keys:
+            return {}
+        now = time.time()
+        with self._pending_lock:
+            pending = {key: self._pending[key] for key in keys if key in self._pending}
+        found = {key: (result, now - fetched_at) for key, (result, fetched_at) in pending.items()}
+
+        missing = list(set(keys) - set(found))
+        if not missing:
+            return found
+        db = ReadSessionLocal()
+        try:
+            rows = db.query(AdverseEventSignal).filter(AdverseEventSignal.pair_key.in_(missing)).all()
+            found.update({row.pair_key: (json.loads(row.result), now - row.fetched_at) for row in rows})
+        except Exception as e:
+            print(f"OpenFDA cache read error: {e}")
+        finally:
+            db.close()
+        return found
+
+    def get(self, key: str):
+        """Return (result, age_seconds) or None."""
+        return self.get_many([key]).get(key)
+
+    def put_many(self, entries: dict, fetched_at: float = None):
+        """Upsert {pair_key: result} entries."""
+        fetched_at = fetched_at or time.time()
+        return self._write({key: (result, fetched_at) for key, result in entries.items()})
+
+    def _write(self, entries: dict):
+        """Upsert {pair_key: (result, fetched_at)} in one transaction."""
+        if not entries:
+            return 0
+        db = SessionLocal()
+        try:
+            for key, (result, fetched_at) in entries.items():
+                db.merge(AdverseEventSignal(pair_key=key, result=json.dumps(result), fetched_at=fetched_at))
+            db.commit()
+            return len(entries)
+        except Exception as e:
+            db.rollback()
+            print(f"OpenFDA cache write error: {e}")
+            return 0
+        finally:
+            db.close()
+
+    def put(self, key: str, result: dict):
+        if not self.WRITE_BEHIND:
+            self.put_many({key: result})
+            return
+        with self._pending_lock:
+            schedule = not self._pending
+            self._pending[key] = (result, time.time())
+        if schedule:
+            self._writer.submit(self._write_pending)
+
+    def _write_pending(self):
+        # Everything queued since the last write goes in one transaction
+        with self._pending_lock:
+            batch = dict(self._pending)
+        self._write(batch)
+        with self._pending_lock:
+            for key, entry in batch.items():
+                if self._pending.get(key) is entry:
+                    del self._pending[key]
+            if self._pending:
+                self._writer.submit(self._write_pending)
+
+    def flush(self):
+        """Wait until every queued result is written."""
+        while True:
+            self._writer.submit(lambda: None).result()
+            with self._pending_lock:
+                if not self._pending:
+                    return
+
+    def is_fresh(self, age: float) -> bool:
+        return age < self.TTL
+
+    def is_servable(self, age: float) -> bool:
+        """Stale-but-usable, or anything at all when offline."""
+        return self.OFFLINE or age < self.STALE_TTL
+
+    def load_snapshot(self, file_path: str) -> int:
+        """
+        Bulk-load a snapshot file to pre-warm the cache.
+        Format: {"pairs": [{"drug_1": "<rxcui or name>", "drug_2": "...", "result": {...}, "fetched_at": 1700000000}]}
+        `fetched_at` is optional and defaults to now.
+        """
+        with open(file_path, mode='r', encoding='utf-8') as f:
+            data = json.load(f)
+
+        by_time = {}
+        for item in data.get("pairs", []):
+            if not item.get("drug_1") or not item.get("drug_2") or "result" not in item:
+                continue
+            drug_1, drug_2 = str(item["drug_1"]).strip(), str(item["drug_2"]).strip()
+            # RxCUIs are numeric; anything else is a drug name, keyed lowercased like lookups
+            key = self.pair_key(drug_1, drug_2, drug_1 if drug_1.isdigit() else None,
+                                drug_2 if drug_2.isdigit() else None)
+            by_time.setdefault(item.get("fetched_at"), {})[key] = item["result"]
+
+        count = 0
+        for fetched_at, entries in by_time.items():
+            count += self.put_many(entries, fetched_at)
+        return count
+
+    def export_snapshot(self, file_path: str) -> int:
+        """Write the whole cache to a snapshot file (same format as load_snapshot)."""
+        self.flush()
+        db = SessionLocal()
+        try:
+            pairs = []
+            for row in db.query(AdverseEventSignal).order_by(AdverseEventSignal.pair_key):
+                drug_1, drug_2 = row.pair_key.split("|", 1)
+                pairs.append({"drug_1": drug_1, "drug_2": drug_2, "result": json.loads(row.result), "fetched_at": row.fetched_at})
+        finally:
+            db.close()
+
+        with open(file_path, mode='w', encoding='utf-8') as f:
+            json.dump({"pairs": pairs}, f, ensure_ascii=False, indent=1)
+        return len(pairs)
+
+openfda_cache = OpenFDACache()
@@ -1,10 +1,85 @@
-import requests
+import asyncio
+import contextvars
+import os
+import threading
 import urllib.parse
+from concurrent.futures import ThreadPoolExecutor, wait
+from .async_io import run_io
+from .http_client import http_client
+from .metrics import metrics
+from .openfda_cache import openfda_cache
 
 class OpenFDAService:
     BASE_URL = "https://api.fda.gov/drug/event.json"
 
+    # Pair fan-out settings (overridable per call or via environment)
+    MAX_CONCURRENCY = int(os.getenv("OPENFDA_MAX_CONCURRENCY", "8"))
+    CHECK_DEADLINE = float(os.getenv("OPENFDA_CHECK_DEADLINE", "12"))
+
+    def __init__(self):
+        # Background stale-while-revalidate refreshes
+        self._refresh_executor = ThreadPoolExecutor(max_workers=2)
+        self._refreshing = set()
+        self._refreshing_lock = threading.Lock()
+
     def get_adverse_events(self, drug1_name: str, drug2_name: str, drug1_rxcui: str = None, drug2_rxcui: str = None):
+        """
+        Cached adverse-event lookup for a pair (see OpenFDACache for freshness rules).
+        """
+        key = openfda_cache.pair_key(drug1_name, drug2_name, drug1_rxcui, drug2_rxcui)
+        cached = openfda_cache.get(key)
+        served = self._serve_cached(key, cached, (drug1_name, drug2_name, drug1_rxcui, drug2_rxcui))
+        if served is not None:
+            return served
+        return self._fetch_and_store(key, drug1_name, drug2_name, drug1_rxcui, drug2_rxcui)
+
+    def _serve_cached(self, key: str, cached, query: tuple):
+        """
+        Return a cached result if usable (scheduling a refresh when stale), else None.
+        While the OpenFDA circuit breaker is open any cached result is served, however old.
+        """
+        available = http_client.is_available(self.BASE_URL)
+        if cached is not None:
+            result, age = cached
+            if openfda_cache.is_fresh(age):
+                metrics.cache("openfda", "hit")
+                return result
+            if openfda_cache.is_servable(age) or not available:
+                metrics.cache("openfda", "stale")
+                if available and not openfda_cache.OFFLINE:
+                    self._schedule_refresh(key, query)
+                return result
+        metrics.cache("openfda", "miss")
+        if openfda_cache.OFFLINE:
+            return {"found": False, "risk_score": 0, "top_reactions": [], "offline": True}
+        if not available:
+            return {"found": False, "risk_score": 0, "top_reactions": [], "unavailable": True}
+        return None
+
+    def _schedule_refresh(self, key: str, query: tuple):
+        with self._refreshing_lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        def refresh():
+            try:
+                self._fetch_and_store(key, *query)
+            finally:
+                with self._refreshing_lock:
+                    self._refreshing.discard(key)
+
+        self._refresh_executor.submit(refresh)
+
+    def _fetch_and_store(self, key: str, drug1_name: str, drug2_name: str, drug1_rxcui: str = None, drug2_rxcui: str = None):
+        with metrics.stage("openfda.fetch"):
+            result = self._fetch_live(drug1_name, drug2_name, drug1_rxcui, drug2_rxcui)
+        # Errors are transient; only cache real answers (including "no reports found")
+        if "error" not in result:
+            openfda_cache.put(key, result)
+        return result
+
+    def _fetch_live(self, drug1_name: str, drug2_name: str, drug1_rxcui: str = None, drug2_rxcui: str = None):
         """
         Query OpenFDA for adverse events using BOTH Name and RxCUI for maximum coverage.
         Returns a rich risk assessment.
@@ -32,7 +107,7 @@ class OpenFDAService:
         full_url = f"{self.BASE_URL}?{query}&{count_param}"
         
         try:
-            response = requests.get(full_url, timeout=10) # Increased timeout
+            response = http_client.get(full_url)
             if response.status_code == 404:
                  return {"found": False, "risk_score": 0, "top_reactions": []}
             
@@ -77,4 +152,100 @@ class OpenFDAService:
             print(f"OpenFDA Error: {e}")
             return {"error": str(e)}
 
+    def get_adverse_events_bulk(self, queries: list, max_concurrency: int = None, deadline: float = None) -> dict:
+        """
+        Run many pair queries concurrently.
+        `queries` is a list of (drug1_name, drug2_name, drug1_rxcui, drug2_rxcui) tuples.
+        Returns {(drug1_rxcui, drug2_rxcui): result}. Pairs still running when `deadline`
+        seconds elapse are abandoned and reported as {"found": False, "timed_out": True}.
+        """
+        if not queries:
+            return {}
+
+        max_concurrency = max_concurrency or self.MAX_CONCURRENCY
+        deadline = self.CHECK_DEADLINE if deadline is None else deadline
+
+        results, to_fetch = self._serve_many_cached(queries)
+        if not to_fetch:
+            return results
+
+        executor = ThreadPoolExecutor(max_workers=min(max_concurrency, len(to_fetch)))
+        try:
+            # Each fetch runs in a copy of the caller's context so it reports to the same request
+            futures = {
+                executor.submit(contextvars.copy_context().run, self._fetch_and_store, key, *query): (query[2], query[3])
+                for key, query in to_fetch
+            }
+            done, not_done = wait(futures, timeout=deadline)
+
+            for future in done:
+                results[futures[future]] = future.result()
+            for future in not_done:
+                future.cancel()
+                results[futures[future]] = {"found": False, "timed_out": True}
+
+            if not_done:
+                print(f"OpenFDA deadline ({deadline}s) hit: {len(not_done)}/{len(to_fetch)} pairs pending")
+            return results
+        finally:
+            # Don't block the request on stragglers; they finish in the background
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    async def get_adverse_events_bulk_async(self, queries: list, max_concurrency: int = None, deadline: float = None) -> dict:
+        """
+        Async get_adverse_events_bulk (same arguments and result shape). Pair fetches run on
+        the shared async I/O pool, so waiting on OpenFDA doesn't hold a request thread.
+        """
+        if not queries:
+            return {}
+
+        max_concurrency = max_concurrency or self.MAX_CONCURRENCY
+        deadline = self.CHECK_DEADLINE if deadline is None else deadline
+
+        results, to_fetch = await run_io(self._serve_many_cached, queries)
+        if not to_fetch:
+            return results
+
+        limit = asyncio.Semaphore(max_concurrency)
+
+        async def fetch(key, query):
+            async with limit:
+                return await run_io(self._fetch_and_store, key, *query)
+
+        tasks = {
+            asyncio.ensure_future(fetch(key, query)): (query[2], query[3])
+            for key, query in to_fetch
+        }
+        done, pending = await asyncio.wait(tasks, timeout=deadline)
+
+        for task in done:
+            results[tasks[task]] = task.result()
+        for task in pending:
+            # Fetches already running finish in the background and still fill the cache
+            task.cancel()
+            results[tasks[task]] = {"found": False, "timed_out": True}
+
+        if pending:
+            print(f"OpenFDA deadline ({deadline}s) hit: {len(pending)}/{len(to_fetch)} pairs pending")
+        return results
+
+    def _serve_many_cached(self, queries: list):
+        """
+        Serve everything we can from the persistent cache (one query for the whole check).
+        Returns ({(drug1_rxcui, drug2_rxcui): result}, [(pair_key, query) still to fetch]).
+        """
+        keys = [openfda_cache.pair_key(*query) for query in queries]
+        with metrics.stage("openfda.cache_lookup"):
+            cached = openfda_cache.get_many(keys)
+
+        results = {}
+        to_fetch = []
+        for key, query in zip(keys, queries):
+            served = self._serve_cached(key, cached.get(key), query)
+            if served is not None:
+                results[(query[2], query[3])] = served
+            else:
+                to_fetch.append((key, query))
+        return results, to_fetch
+
 openfda_service = OpenFDAService()
@@ -0,0 +1,180 @@
+import os
+import re
+import threading
+import time
+from types import MappingProxyType
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from ..database import ReadSessionLocal
+from ..models import FoodInteractionRule, ConditionInteractionRule
+from .drug_class_registry import DrugClassRegistry
+from .keyword_matcher import KeywordMatcher
+
+# Condition IDs used by the frontend that differ from the normalized CSV names
+CONDITION_ALIASES = {
+    "peptic_ulcer": "ulcer",
+}
+
+def normalize_key(value: str) -> str:
+    """'ACE Inhibitors' -> 'ace_inhibitors', 'Kidney Disease (eGFR<30)' -> 'kidney_disease_egfr_30'."""
+    return re.sub(r"[^0-9a-z\u0600-\u06FF]+", "_", (value or "").lower()).strip("_")
+
+def normalize_condition_id(value: str) -> str:
+    key = normalize_key(value)
+    return CONDITION_ALIASES.get(key, key)
+
+
+class RuleIndex:
+    """Immutable lookup: generic name -> rules, plus a compiled matcher over the generic names."""
+
+    def __init__(self, rules_by_generic: dict):
+        self.rules = MappingProxyType({k: tuple(v) for k, v in rules_by_generic.items()})
+        self.matcher = KeywordMatcher((generic.replace("_", " "), generic) for generic in self.rules)
+
+    def match(self, drug_name: str) -> list:
+        """Generic keys found in `drug_name`, in order of appearance, without repeats."""
+        text = normalize_key(drug_name).replace("_", " ")
+        return list(dict.fromkeys(generic for _, generic in self.matcher.find(text)))
+
+
+class RuleStore:
+    """
+    Food and condition rules, built from the `food_interaction_rules` and
+    `condition_interaction_rules` tables (ingested from data/*.csv) on top of the
+    services' built-in rules. Table rules replace built-in rules for the same generic.
+    Rebuilt in place after ingestion or on demand, without a restart.
+    """
+    REFRESH_INTERVAL = float(os.getenv("RULE_STORE_REFRESH_SECONDS", "30"))
+
+    def __init__(self):
+        self._food = None
+        self._conditions = MappingProxyType({})
+        self._fingerprint = None
+        self._stale = True
+        self._last_check = 0.0
+        self._build_lock = threading.Lock()
+        self._class_members_cache = None
+
+    def food_index(self) -> RuleIndex:
+        self.ensure_fresh()
+        return self._food
+
+    def condition_index(self, condition_id: str):
+        """RuleIndex for a normalized condition ID, or None if there are no rules for it."""
+        self.ensure_fresh()
+        return self._conditions.get(condition_id)
+
+    def invalidate(self):
+        self._stale = True
+
+    def ensure_fresh(self, db: Session = None):
+        """Rebuild if invalidated, or if the rule tables changed since the last build (throttled)."""
+        if self._stale:
+            self.build(db)
+            return
+        if time.monotonic() - self._last_check < self.REFRESH_INTERVAL:
+            return
+        self._last_check = time.monotonic()
+        own_session = db is None
+        if own_session:
+            db = ReadSessionLocal()
+        try:
+            try:
+                fingerprint = self._table_fingerprint(db)
+            except Exception:
+                fingerprint = None
+            if fingerprint != self._fingerprint:
+                self.build(db)
+        finally:
+            if own_session:
+                db.close()
+
+    def build(self, db: Session = None) -> dict:
+        """Rebuild both indexes from the built-in rules plus the rule tables."""
+        # Imported here: the services import this module at load time
+        from .food_interaction_service import FoodInteractionService
+        from .condition_service import ConditionInteractionService
+
+        own_session = db is None
+        if own_session:
+            db = ReadSessionLocal()
+        try:
+            with self._build_lock:
+                try:
+                    food_rows = db.query(FoodInteractionRule).order_by(FoodInteractionRule.id).all()
+                    condition_rows = db.query(ConditionInteractionRule).order_by(ConditionInteractionRule.id).all()
+                    fingerprint = self._table_fingerprint(db)
+                except Exception as e:
+                    # Tables not created yet: serve the built-in rules only
+                    print(f"Rule tables unavailable, using built-in rules: {e}")
+                    food_rows, condition_rows, fingerprint = [], [], None
+
+                # 1. Food: table rules per generic, built-ins for generics the table doesn't cover
+                food = {}
+                for row in food_rows:
+                    rule = {
+                        "food": row.food,
+                        "severity": row.severity,
+                        "color": row.color,
+                        "description_en": row.description_en,
+                        "description_ar": row.description_ar,
+                    }
+                    for generic in self._expand(row.drug_name):
+                        food.setdefault(generic, []).append(rule)
+                for keyword, rule in FoodInteractionService.FOOD_RULES.items():
+                    food.setdefault(normalize_key(keyword), [rule])
+
+                # 2. Conditions: condition_id -> generic -> rules, same precedence
+                conditions = {}
+                for row in condition_rows:
+                    rule = {
+                        "severity": row.severity,
+                        "color": row.color,
+                        "description_en": row.description_en,
+                        "description_ar": row.description_ar,
+                    }
+                    by_generic = conditions.setdefault(row.condition_id, {})
+                    for generic in self._expand(row.drug_name):
+                        by_generic.setdefault(generic, []).append(rule)
+                for condition_id, rules in ConditionInteractionService.CONDITION_RULES.items():
+                    by_generic = conditions.setdefault(condition_id, {})
+                    builtin = {}
+                    for rule in rules:
+                        for keyword in rule["drugs"]:
+                            builtin.setdefault(normalize_key(keyword), []).append(rule)
+                    for generic, generic_rules in builtin.items():
+                        by_generic.setdefault(generic, generic_rules)
+
+                self._food = RuleIndex(food)
+                self._conditions = MappingProxyType({cid: RuleIndex(rules) for cid, rules in conditions.items()})
+                self._fingerprint = fingerprint
+                self._stale = False
+                self._last_check = time.monotonic()
+
+            return {"food_generics": len(food), "conditions": len(conditions)}
+        finally:
+            if own_session:
+                db.close()
+
+    def _expand(self, drug_name: str) -> list:
+        """A CSV drug name is either a generic or a DrugClassRegistry class; classes expand to members."""
+        key = normalize_key(drug_name)
+        members = self._class_members().get(key)
+        if members:
+            return members
+        return [key]
+
+    def _class_members(self) -> dict:
+        if self._class_members_cache is None:
+            self._class_members_cache = {
+                normalize_key(class_name): list(dict.fromkeys(normalize_key(d["name"]) for d in drugs))
+                for class_name, drugs in DrugClassRegistry.CLASSES.items()
+            }
+        return self._class_members_cache
+
+    def _table_fingerprint(self, db: Session):
+        food = db.query(func.count(FoodInteractionRule.id), func.max(FoodInteractionRule.id)).one()
+        condition = db.query(func.count(ConditionInteractionRule.id), func.max(ConditionInteractionRule.id)).one()
+        return tuple(food) + tuple(condition)
+
+rule_store = RuleStore()
@@ -1,10 +1,48 @@
-import requests
+import contextvars
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
 from fastapi import HTTPException
-from difflib import SequenceMatcher
 import re
+from sqlalchemy.orm import Session
+from ..database import ReadSessionLocal
+from ..models import Drug, EgyptianDrug
+from .cache import TTLCache
+from .arabic_index import ArabicNameIndex, normalize_arabic
+from .local_search import local_search
+from .http_client import http_client, CircuitOpenError
+from .metrics import metrics
+from .fuzzy_index import FuzzyIndex
+from .drug_class_registry import DrugClassRegistry
 
 class RxNavService:
     BASE_URL = "https://rxnav.nlm.nih.gov/REST"
+
+    # Name resolution cache (shared across requests)
+    NAME_CACHE_SIZE = 5000
+    NAME_CACHE_TTL = 24 * 3600  # RxNorm names are effectively static
+    # Concurrent RxNav name fetches per process (all share http_client's connection pool)
+    NAME_FETCH_CONCURRENCY = int(os.getenv("RXNAV_NAME_CONCURRENCY", "8"))
+
+    def __init__(self):
+        self._name_cache = TTLCache(maxsize=self.NAME_CACHE_SIZE, ttl=self.NAME_CACHE_TTL)
+        self._name_fetcher = ThreadPoolExecutor(max_workers=self.NAME_FETCH_CONCURRENCY, thread_name_prefix="rxnav-names")
+        self._names_in_flight = {}  # RxCUI -> Future of the one RxNav fetch running for it
+        self._names_in_flight_guard = threading.Lock()
+
+        # Arabic lookup index (ARABIC_MAP now, Egyptian trade names merged lazily)
+        self._arabic_index = ArabicNameIndex(self.ARABIC_MAP)
+        self._trade_names_loaded = False
+
+        # Synonym expansion: every generic/brand -> generic, plus an edit-distance index over them
+        self._synonym_to_generic = {}
+        for generic, brands in self.DRUG_SYNONYMS.items():
+            self._synonym_to_generic.setdefault(generic, generic)
+            for brand in brands:
+                self._synonym_to_generic.setdefault(brand, generic)
+        self._synonym_index = FuzzyIndex(self._synonym_to_generic)
+        self._fuzzy_index = None  # Full spelling vocabulary, built on first use
     
     # Extended Arabic to English drug mapping
     ARABIC_MAP = {
@@ -109,101 +147,110 @@ class RxNavService:
 
     def _normalize_arabic(self, text: str) -> str:
         """Normalize Arabic text for better matching."""
-        # Remove diacritics/tashkeel
-        text = re.sub(r'[\u064B-\u065F]', '', text)
-        # Remove tatweel
-        text = text.replace('\u0640', '')
-        # Normalize alef variations
-        text = re.sub(r'[آأإ]', 'ا', text)
-        # Normalize taa marbuta
-        text = text.replace('ة', 'ه')
-        # Normalize yaa
-        text = text.replace('ى', 'ي')
-        return text.strip()
-
-    def _fuzzy_match(self, query: str, target: str) -> float:
-        """Calculate fuzzy match score between query and target."""
-        query = query.lower().strip()
-        target = target.lower().strip()
-        
-        # Exact match
-        if query == target:
-            return 1.0
-        
-        # Starts with
-        if target.startswith(query) or query.startswith(target):
-            return 0.9
-        
-        # Contains
-        if query in target or target in query:
-            return 0.8
-        
-        # Sequence matcher for typos
-        return SequenceMatcher(None, query, target).ratio()
+        return normalize_arabic(text)
 
     def _translate_arabic(self, name: str) -> str:
         """Translate Arabic drug name to English."""
-        normalized = self._normalize_arabic(name)
-        
-        # Direct match
-        if name in self.ARABIC_MAP:
-            return self.ARABIC_MAP[name]
-        
-        # Normalized match
-        for arabic, english in self.ARABIC_MAP.items():
-            if self._normalize_arabic(arabic) == normalized:
-                return english
-        
-        # Fuzzy match for Arabic (catch typos)
-        best_score = 0.0
-        best_match = None
-        for arabic, english in self.ARABIC_MAP.items():
-            score = self._fuzzy_match(normalized, self._normalize_arabic(arabic))
-            if score > best_score and score > 0.75:  # 75% similarity threshold
-                best_score = score
-                best_match = english
-        
-        return best_match or name
+        index = self._get_arabic_index()
+
+        # Direct / normalized match (dict probe)
+        english = index.lookup(name)
+        if english:
+            return english
+
+        # Fuzzy match for Arabic (catch typos), 75% similarity threshold
+        candidates = index.candidates(name, limit=1)
+        if candidates and candidates[0]["score"] > 0.75:
+            return candidates[0]["name"]
+        return name
+
+    def translate_arabic_candidates(self, name: str, limit: int = 5) -> list:
+        """Ranked English candidates for an Arabic query: [{"arabic", "name", "score"}]."""
+        return self._get_arabic_index().candidates(name, limit=limit, min_score=0.6)
+
+    def invalidate_trade_names(self):
+        """Re-merge Egyptian names into the Arabic and spelling indexes (called after ingestion)."""
+        self._trade_names_loaded = False
+        self._fuzzy_index = None
+
+    def _get_arabic_index(self) -> ArabicNameIndex:
+        """
+        ARABIC_MAP is indexed at import; Arabic trade names from `egyptian_drugs`
+        are merged in on first use (mapped to their generic names).
+        """
+        if not self._trade_names_loaded:
+            self._trade_names_loaded = True
+            try:
+                db = ReadSessionLocal()
+                try:
+                    rows = db.query(EgyptianDrug.trade_name_ar, EgyptianDrug.generic_name).all()
+                finally:
+                    db.close()
+                entries = dict(self.ARABIC_MAP)  # Curated map wins over DB trade names
+                for trade_name_ar, generic_name in rows:
+                    if trade_name_ar and generic_name:
+                        entries.setdefault(trade_name_ar.strip(), generic_name.strip())
+                self._arabic_index = ArabicNameIndex(entries)
+            except Exception as e:
+                print(f"Egyptian trade names unavailable for Arabic lookup: {e}")
+        return self._arabic_index
 
     def _expand_search_terms(self, name: str) -> list:
         """Expand search to include synonyms and variations."""
         terms = [name]
         name_lower = name.lower()
         
-        # Check if it's a known synonym
-        for generic, brands in self.DRUG_SYNONYMS.items():
-            if name_lower == generic or name_lower in brands:
-                terms.append(generic)
-                terms.extend(brands)
-                break
-            # Fuzzy match against synonyms
-            for brand in brands:
-                if self._fuzzy_match(name_lower, brand) > 0.8:
-                    terms.append(generic)
-                    terms.extend(brands)
-                    break
+        # Check if it's a known synonym (dict probe), else fuzzy match against synonyms
+        generics = []
+        if name_lower in self._synonym_to_generic:
+            generics.append(self._synonym_to_generic[name_lower])
+        else:
+            # Prefix matches and close spellings only: a mere substring is too weak to expand on
+            for match in self._synonym_index.similar(name_lower, min_score=0.8, substrings=False):
+                generics.append(self._synonym_to_generic[match["name"].lower()])
+
+        for generic in dict.fromkeys(generics):
+            terms.append(generic)
+            terms.extend(self.DRUG_SYNONYMS[generic])
         
         return list(set(terms))
 
     def _suggest_corrections(self, query: str) -> list:
         """Suggest possible corrections for misspelled drug names."""
-        suggestions = []
-        query_lower = query.lower()
-        
-        # Check against all known drug names
-        all_names = list(self.DRUG_SYNONYMS.keys())
-        for synonyms in self.DRUG_SYNONYMS.values():
-            all_names.extend(synonyms)
-        
-        for name in all_names:
-            score = self._fuzzy_match(query_lower, name)
-            if score > 0.6 and score < 1.0:
-                suggestions.append({"name": name, "score": score})
-        
-        # Sort by score descending
-        suggestions.sort(key=lambda x: x["score"], reverse=True)
+        query = query.strip()
+        if re.search(r'[\u0600-\u06FF]', query):
+            query = self._normalize_arabic(query)
+
+        # Edit-distance search over every known English and Arabic name
+        suggestions = [
+            s for s in self._get_fuzzy_index().similar(query, min_score=0.6)
+            if s["score"] < 1.0
+        ]
         return suggestions[:5]  # Top 5 suggestions
 
+    def _get_fuzzy_index(self) -> FuzzyIndex:
+        """
+        Spelling index over DRUG_SYNONYMS, DrugClassRegistry, ARABIC_MAP and Egyptian trade/generic
+        names. Built on first use and again after Egyptian drug ingestion.
+        """
+        if self._fuzzy_index is None:
+            names = list(self._synonym_to_generic)
+            for drugs in DrugClassRegistry.CLASSES.values():
+                names.extend(d["name"] for d in drugs)
+            for arabic, english in self.ARABIC_MAP.items():
+                names.extend((self._normalize_arabic(arabic), english))
+            try:
+                db = ReadSessionLocal()
+                try:
+                    for row in db.query(EgyptianDrug.trade_name_en, EgyptianDrug.trade_name_ar, EgyptianDrug.generic_name):
+                        names.extend((row[0], self._normalize_arabic(row[1] or ""), row[2]))
+                finally:
+                    db.close()
+            except Exception as e:
+                print(f"Egyptian drug names unavailable for spelling suggestions: {e}")
+            self._fuzzy_index = FuzzyIndex(n for n in names if n)
+        return self._fuzzy_index
+
     def search_drug(self, name: str):
         """
         Smart drug search with:
@@ -218,16 +265,30 @@ class RxNavService:
         if re.search(r'[\u0600-\u06FF]', name):
             name = self._translate_arabic(name)
         
+        # Local-first: every FTS hit is an exact, whole-word or prefix match, so any hit is
+        # answered without the network; RxNav is only asked when the index has nothing
+        with metrics.stage("rxnav.local_search"):
+            local_results = local_search.search(original_query)
+            if name != original_query:
+                local_results += local_search.search(name)
+        if local_results:
+            return self._search_response(local_results, name, original_query, [], source="local")
+
+        # RxNav circuit breaker open: fail fast (suggestions only)
+        if not http_client.is_available(self.BASE_URL):
+            return self._search_response([], name, original_query, [], source="local")
+
         # Expand to include synonyms
         search_terms = self._expand_search_terms(name)
         
-        all_results = []
+        all_results = list(local_results)
         tried_queries = []
+        start = time.perf_counter()
         
         for term in search_terms[:3]:  # Limit to avoid too many API calls
             try:
                 # Try approximate match first for typos
-                response = requests.get(
+                response = http_client.get(
                     f"{self.BASE_URL}/approximateTerm.json",
                     params={"term": term, "maxEntries": 10}
                 )
@@ -257,7 +318,7 @@ class RxNavService:
                 tried_queries.append(term)
                 
                 # Also try exact drugs.json for complete info
-                response = requests.get(f"{self.BASE_URL}/drugs.json", params={"name": term})
+                response = http_client.get(f"{self.BASE_URL}/drugs.json", params={"name": term})
                 if response.status_code == 200:
                     data = response.json()
                     if 'drugGroup' in data and 'conceptGroup' in data['drugGroup']:
@@ -273,10 +334,16 @@ class RxNavService:
                                             "synonyms": prop.get('synonym', '')
                                         })
                 
+            except CircuitOpenError:
+                break  # Remaining terms would fail fast too
             except Exception as e:
                 print(f"Search error for {term}: {e}")
                 continue
+        metrics.observe_stage("rxnav.search_upstream", time.perf_counter() - start)
         
+        return self._search_response(all_results, name, original_query, tried_queries, source="rxnav")
+
+    def _search_response(self, all_results: list, name: str, original_query: str, tried_queries: list, source: str):
         # Remove duplicates and sort by score
         seen = set()
         unique_results = []
@@ -285,28 +352,123 @@ class RxNavService:
                 seen.add(r['rxcui'])
                 unique_results.append(r)
         
-        # Get spelling suggestions if few results
+        # Arabic queries: the other English readings (the best one was searched)
         suggestions = []
+        if re.search(r'[\u0600-\u06FF]', original_query):
+            suggestions = [c for c in self.translate_arabic_candidates(original_query)
+                           if c["name"].lower() != name.lower()]
+
+        # Get spelling suggestions if few results
         if len(unique_results) < 3:
-            suggestions = self._suggest_corrections(original_query)
+            with metrics.stage("rxnav.suggestions"):
+                suggestions += self._suggest_corrections(original_query)
+
+        seen_names = set()
+        suggestions = [
+            s for s in suggestions
+            if s["name"].lower() not in seen_names and not seen_names.add(s["name"].lower())
+        ]
         
         return {
             "results": unique_results[:15],
             "query": name,
             "original_query": original_query,
-            "suggestions": suggestions,
-            "searched_terms": tried_queries
+            "suggestions": suggestions[:5],
+            "searched_terms": tried_queries,
+            "source": source
         }
 
-    def get_name(self, rxcui: str):
-        """Get drug name by RxCUI."""
+    def get_name(self, rxcui: str, db: Session = None):
+        """Get drug name by RxCUI (cached, local DB first, RxNav as fallback)."""
+        return self.get_names([rxcui], db).get(rxcui)
+
+    def get_names(self, rxcuis: list[str], db: Session = None) -> dict:
+        """
+        Resolve many RxCUIs to names at once.
+        Order: in-process cache -> local `drugs` table (one query) -> RxNav for the rest,
+        fetched concurrently. Each RxCUI hits RxNav at most once per NAME_CACHE_TTL window.
+        """
+        names = {}
+        missing = []
+        for rxcui in dict.fromkeys(rxcuis):
+            cached = self._name_cache.get(rxcui)
+            if cached is TTLCache.MISSING:
+                missing.append(rxcui)
+            else:
+                names[rxcui] = cached
+        metrics.cache("rxnav_names", "hit", len(names))
+        metrics.cache("rxnav_names", "miss", len(missing))
+
+        if missing:
+            with metrics.stage("rxnav.local_names"):
+                for rxcui, name in self._lookup_local_names(missing, db).items():
+                    self._name_cache.set(rxcui, name)
+                    names[rxcui] = name
+            missing = [r for r in missing if r not in names]
+
+        if missing:
+            with metrics.stage("rxnav.fetch_names"):
+                futures = {rxcui: self._name_future(rxcui) for rxcui in missing}
+                wait(futures.values())
+                for rxcui, future in futures.items():
+                    names[rxcui] = future.result()
+
+        return names
+
+    def _lookup_local_names(self, rxcuis: list[str], db: Session = None) -> dict:
+        """Batch lookup of names already stored in the local `drugs` table."""
+        own_session = db is None
+        if own_session:
+            db = ReadSessionLocal()
+        try:
+            rows = db.query(Drug.rxcui, Drug.name).filter(Drug.rxcui.in_(rxcuis)).all()
+            return {rxcui: name for rxcui, name in rows if name}
+        except Exception as e:
+            print(f"Local name lookup error: {e}")
+            return {}
+        finally:
+            if own_session:
+                db.close()
+
+    def _name_future(self, rxcui: str):
+        """
+        Future for an RxNav name fetch, collapsing concurrent requests for the same RxCUI:
+        callers that arrive while one is running share its Future instead of fetching again.
+        """
+        with self._names_in_flight_guard:
+            future = self._names_in_flight.get(rxcui)
+            if future is None:
+                # Runs in a copy of the caller's context so it reports to the same request
+                future = self._name_fetcher.submit(contextvars.copy_context().run, self._fetch_name, rxcui)
+                self._names_in_flight[rxcui] = future
+                future.add_done_callback(lambda done: self._forget_in_flight(rxcui, done))
+        return future
+
+    def _forget_in_flight(self, rxcui: str, future):
+        # The result is in the cache by now (or was transient): later callers start afresh
+        with self._names_in_flight_guard:
+            if self._names_in_flight.get(rxcui) is future:
+                del self._names_in_flight[rxcui]
+
+    def _fetch_name(self, rxcui: str):
+        # Filled by a fetch that finished between the caller's cache check and now
+        cached = self._name_cache.get(rxcui)
+        if cached is not TTLCache.MISSING:
+            return cached
         try:
-            response = requests.get(f"{self.BASE_URL}/rxcui/{rxcui}/properties.json")
+            response = http_client.get(f"{self.BASE_URL}/rxcui/{rxcui}/properties.json")
             if response.status_code == 200:
                 data = response.json()
-                return data.get('properties', {}).get('name', 'Unknown')
-        except:
+                name = (data.get('properties') or {}).get('name', 'Unknown')
+            elif response.status_code == 404:
+                name = None  # Unknown RxCUI: a definite answer, worth caching
+            else:
+                # 429/5xx left after http_client's retries: transient, let the next call retry
+                return None
+            self._name_cache.set(rxcui, name)
+            return name
+        except Exception:
+            # Network failure: don't cache, so the next call can retry
             return None
-        return None
 
 rxnav_service = RxNavService()
@@ -0,0 +1,88 @@
+"""
+Re-record the stand-in fixtures from the live RxNav and OpenFDA APIs (needs network).
+
+    python -m benchmarks.record_fixtures [--max-pairs 200]
+
+Records every RxNav request the search benchmark can make and the OpenFDA pair queries
+of the check benchmark. OpenFDA "no matches" (404) answers are not stored: the stand-in
+gives the same answer for any pair missing from the fixtures.
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import time
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks import workload
+from benchmarks.stand_in import FIXTURES_DIR
+from backend.services.openfda_service import OpenFDAService
+from backend.services.rxnav_service import RxNavService, rxnav_service
+
+
+def record_rxnav(session: requests.Session) -> dict:
+    fixtures = {"approximateTerm": {}, "drugs": {}, "properties": {}}
+    terms = []
+    for queries in workload.SEARCH_QUERIES.values():
+        for query in queries:
+            name = rxnav_service._translate_arabic(query) if re.search(r"[\u0600-\u06FF]", query) else query
+            terms.extend(rxnav_service._expand_search_terms(name))
+
+    for term in dict.fromkeys(t.lower() for t in terms):
+        approximate = session.get(f"{RxNavService.BASE_URL}/approximateTerm.json",
+                                  params={"term": term, "maxEntries": 10}, timeout=30).json()
+        fixtures["approximateTerm"][term] = approximate
+        fixtures["drugs"][term] = session.get(f"{RxNavService.BASE_URL}/drugs.json",
+                                              params={"name": term}, timeout=30).json()
+        candidates = (approximate.get("approximateGroup") or {}).get("candidate") or []
+        if isinstance(candidates, dict):
+            candidates = [candidates]
+        for candidate in candidates:
+            rxcui = candidate.get("rxcui")
+            if rxcui and rxcui not in fixtures["properties"]:
+                fixtures["properties"][rxcui] = session.get(
+                    f"{RxNavService.BASE_URL}/rxcui/{rxcui}/properties.json", timeout=30).json()
+    return fixtures
+
+
+def record_openfda(session: requests.Session, max_pairs: int) -> dict:
+    drugs = workload.check_drugs()
+    pairs = {}
+    queried = 0
+    for i, first in enumerate(drugs):
+        for second in drugs[i + 1:]:
+            if queried >= max_pairs:
+                return pairs
+            queried += 1
+            query = (f'search=(patient.drug.medicinalproduct:"{first["name"]}")'
+                     f'+AND+(patient.drug.medicinalproduct:"{second["name"]}")'
+                     '&count=patient.reaction.reactionmeddrapt.exact&limit=10')
+            response = session.get(f"{OpenFDAService.BASE_URL}?{query}", timeout=30)
+            if response.status_code == 200:
+                pairs["|".join(sorted((first["name"].lower(), second["name"].lower())))] = response.json()
+            time.sleep(0.25)  # Stay under OpenFDA's unauthenticated rate limit
+    return pairs
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--max-pairs", type=int, default=200, help="OpenFDA pair queries to record")
+    args = parser.parse_args()
+
+    session = requests.Session()
+    rxnav = record_rxnav(session)
+    with open(os.path.join(FIXTURES_DIR, "rxnav.json"), "w", encoding="utf-8") as f:
+        json.dump(rxnav, f, indent=1, ensure_ascii=False)
+    print(f"Recorded {len(rxnav['approximateTerm'])} RxNav search terms, {len(rxnav['properties'])} properties")
+
+    pairs = record_openfda(session, args.max_pairs)
+    with open(os.path.join(FIXTURES_DIR, "openfda.json"), "w", encoding="utf-8") as f:
+        json.dump({"pairs": pairs}, f, indent=1, ensure_ascii=False)
+    print(f"Recorded {len(pairs)} OpenFDA pairs with reports")
+
+
+if __name__ == "__main__":
+    main()
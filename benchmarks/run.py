@@ -0,0 +1,288 @@
+"""
+Backend hot-path benchmarks, fully offline.
+
+    python -m benchmarks.run [--output results.json] [--baseline previous.json] [--quick]
+
+Runs against a scratch copy of drug_safety.db, with RxNav and OpenFDA served by the
+local stand-in (benchmarks/stand_in.py) from recorded fixtures. Covers:
+- the check_interactions endpoint at list sizes 2-30 (cold, warm, check_cache hit, ETag 304);
+- search_drug for English, Arabic and misspelled queries;
+- ingest_csv throughput;
+- generate_and_save, from a DB without generated rows and as a no-op re-run.
+
+Results are written as JSON. With --baseline, medians slower than the baseline by more
+than --threshold are listed under "regressions" and the exit code is 1.
+"""
+import argparse
+import asyncio
+import contextlib
+import csv
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def summarize(samples: list) -> dict:
+    """Latency summary in milliseconds."""
+    ms = sorted(s * 1000 for s in samples)
+    return {
+        "runs": len(ms),
+        "min_ms": round(ms[0], 3),
+        "median_ms": round(statistics.median(ms), 3),
+        "p95_ms": round(ms[min(len(ms) - 1, int(round(0.95 * (len(ms) - 1))))], 3),
+        "max_ms": round(ms[-1], 3),
+    }
+
+
+def timed(func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return time.perf_counter() - start, result
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def bench_search(workload, repeat: int) -> dict:
+    from backend.services.rxnav_service import rxnav_service
+
+    results = {}
+    for kind, queries in workload.SEARCH_QUERIES.items():
+        results[kind] = {}
+        for query in queries:
+            rxnav_service.search_drug(query)  # Warm the local indexes; RxNav answers aren't cached
+            samples = []
+            for _ in range(repeat):
+                seconds, response = timed(rxnav_service.search_drug, query)
+                samples.append(seconds)
+            results[kind][query] = dict(summarize(samples), source=response.get("source"),
+                                        results=len(response.get("results", [])))
+    return results
+
+
+def bench_check(workload, repeat: int, cold_repeat: int) -> dict:
+    from starlette.requests import Request
+    from backend import main
+    from backend.database import SessionLocal
+    from backend.models import AdverseEventSignal
+    from backend.services.check_cache import check_cache
+    from backend.services.openfda_cache import openfda_cache
+    from backend.services.rxnav_service import rxnav_service
+
+    def reset_caches():
+        rxnav_service._name_cache.clear()
+        check_cache.invalidate()
+        openfda_cache.flush()
+        db = SessionLocal()
+        try:
+            db.query(AdverseEventSignal).delete()
+            db.commit()
+        finally:
+            db.close()
+
+    def check(rxcuis, etag: str = None):
+        # The endpoint itself: check_cache, async pipeline, JSON body and ETag
+        headers = [(b"if-none-match", etag.encode())] if etag else []
+        request = Request({"type": "http", "method": "POST", "path": "/api/check_interactions", "headers": headers})
+        body = main.CheckRequest(rxcuis=rxcuis, conditions=workload.CHECK_CONDITIONS)
+        return asyncio.run(main.check_interactions(body, request))
+
+    def uncached(rxcuis):
+        check_cache.invalidate()
+        return check(rxcuis)
+
+    drugs = [d["rxcui"] for d in workload.check_drugs()]
+    results = {}
+    for size in workload.CHECK_LIST_SIZES:
+        rxcuis = drugs[:size]
+        cold = []
+        for _ in range(cold_repeat):
+            reset_caches()
+            seconds, response = timed(check, rxcuis)
+            cold.append(seconds)
+        # Warm: names and OpenFDA results cached, but no check_cache entry for the set
+        warm = [timed(uncached, rxcuis)[0] for _ in range(repeat)]
+        # Cached: the same set again (reordered), answered from check_cache
+        check(rxcuis)
+        cached = [timed(check, rxcuis[::-1])[0] for _ in range(repeat)]
+        # Revalidated: client sends the ETag back and gets a 304
+        etag = check(rxcuis).headers["etag"]
+        revalidated = [timed(check, rxcuis, etag)[0] for _ in range(repeat)]
+        results[str(size)] = {
+            "pairs": size * (size - 1) // 2,
+            "interactions": len(json.loads(response.body)["interactions"]),
+            "cold": summarize(cold),
+            "warm": summarize(warm),
+            "cached": summarize(cached),
+            "revalidated": summarize(revalidated),
+        }
+    return results
+
+
+def bench_generate(repeat: int) -> dict:
+    from backend.database import SessionLocal
+    from backend.models import Interaction
+    from backend.services.interaction_generator import interaction_generator
+
+    def generate(remove_generated: bool):
+        db = SessionLocal()
+        try:
+            if remove_generated:
+                # The shipped DB already holds every generated pair; start without them
+                db.query(Interaction).filter(Interaction.source.like("Generated:%")).delete(synchronize_session=False)
+                db.commit()
+            return timed(interaction_generator.generate_and_save, db)
+        finally:
+            db.close()
+
+    regenerate, resync = [], []
+    saved = None
+    for _ in range(repeat):
+        seconds, count = generate(remove_generated=True)
+        regenerate.append(seconds)
+        saved = count if saved is None else saved
+        resync.append(generate(remove_generated=False)[0])  # Re-run with nothing to change
+    return {
+        "regenerate": dict(summarize(regenerate), generated_pairs=saved),
+        "resync": summarize(resync),
+    }
+
+
+def bench_ingest(rows: int, workdir: str) -> dict:
+    from backend.services.ingestion_service import ingestion_service
+
+    path = os.path.join(workdir, "bench_interactions.csv")
+    rng = random.Random(42)
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["drug_1_rxcui", "drug_2_rxcui", "severity", "description", "source"])
+        for i in range(rows):
+            a, b = rng.sample(range(1, rows), 2)
+            writer.writerow([f"B{a}", f"B{b}", rng.choice(["Major", "Moderate", "Minor"]),
+                             f"Benchmark interaction {i}", "Benchmark"])
+    return ingestion_service.ingest_csv_stream(path)
+
+
+def run_all(workload, args, workdir: str) -> dict:
+    from backend import database, migrations
+    from backend.services.interaction_index import interaction_index
+    from backend.services.local_search import local_search
+    from backend.services.rule_store import rule_store
+
+    startup = {
+        "migrations": round(timed(migrations.migrate, database.engine)[0] * 1000, 3),
+        "interaction_index": round(timed(interaction_index.build)[0] * 1000, 3),
+        "rule_store": round(timed(rule_store.build)[0] * 1000, 3),
+        "local_search": round(timed(local_search.rebuild)[0] * 1000, 3),
+    }
+    return {
+        "startup_ms": startup,
+        "search_drug": bench_search(workload, args.repeat),
+        "check_interactions": bench_check(workload, args.repeat, max(1, args.repeat // 5)),
+        "generate_and_save": bench_generate(max(1, args.repeat // 5)),
+        "ingest_csv": bench_ingest(args.ingest_rows, workdir),
+    }
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list:
+    """Every median that got slower than the baseline by more than `threshold` (a fraction)."""
+    regressions = []
+
+    def walk(current, previous, path):
+        if not isinstance(current, dict) or not isinstance(previous, dict):
+            return
+        if "median_ms" in current and "median_ms" in previous and previous["median_ms"] > 0:
+            ratio = current["median_ms"] / previous["median_ms"]
+            if ratio > 1 + threshold:
+                regressions.append({"benchmark": "/".join(path), "baseline_ms": previous["median_ms"],
+                                    "current_ms": current["median_ms"], "ratio": round(ratio, 2)})
+        for key, value in current.items():
+            walk(value, previous.get(key), path + [key])
+
+    walk(results, baseline.get("results", {}), [])
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--output", help="Write results JSON here (default: stdout)")
+    parser.add_argument("--baseline", help="Previous results JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Allowed slowdown vs baseline (0.2 = 20%%)")
+    parser.add_argument("--latency-ms", type=float, default=30, help="Stand-in latency per upstream request")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--ingest-rows", type=int, default=50000)
+    parser.add_argument("--quick", action="store_true", help="Fewer repetitions and rows (smoke run)")
+    args = parser.parse_args()
+    if args.quick:
+        args.repeat, args.ingest_rows = 3, 5000
+
+    # Scratch copy of the shipped DB; the backend opens ./drug_safety.db relative to the cwd
+    workdir = tempfile.mkdtemp(prefix="drug-safety-bench-")
+    shutil.copy(os.path.join(REPO_ROOT, "drug_safety.db"), os.path.join(workdir, "drug_safety.db"))
+    os.chdir(workdir)
+    sys.path.insert(0, REPO_ROOT)
+    os.environ.setdefault("INTERACTION_MATRIX_PATH", os.path.join(workdir, "interaction_matrix.bin"))
+
+    from benchmarks import workload
+    from benchmarks.stand_in import StandIn
+    from backend.services.openfda_service import openfda_service
+    from backend.services.rxnav_service import rxnav_service
+
+    stand_in = StandIn(latency_ms=args.latency_ms).start()
+    rxnav_service.BASE_URL = f"{stand_in.url}/REST"
+    openfda_service.BASE_URL = f"{stand_in.url}/drug/event.json"
+
+    try:
+        # Service logging goes to stderr so stdout stays valid JSON
+        with contextlib.redirect_stdout(sys.stderr):
+            results = run_all(workload, args, workdir)
+        report = {
+            "meta": {
+                "commit": git_commit(),
+                "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "upstream_latency_ms": args.latency_ms,
+                "repeat": args.repeat,
+                "ingest_rows": args.ingest_rows,
+                "upstream_requests": stand_in.requests,
+            },
+            "results": results,
+        }
+        exit_code = 0
+        if args.baseline:
+            with open(args.baseline, encoding="utf-8") as f:
+                report["regressions"] = compare(results, json.load(f), args.threshold)
+            exit_code = 1 if report["regressions"] else 0
+    finally:
+        stand_in.stop()
+        os.chdir(REPO_ROOT)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    output = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+        print(f"Benchmark results written to {args.output}")
+    else:
+        print(output)
+    sys.exit(exit_code)
+
+
+if __name__ == "__main__":
+    main()
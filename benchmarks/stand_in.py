@@ -0,0 +1,124 @@
+"""
+Local stand-in for RxNav and OpenFDA, serving recorded responses from benchmarks/fixtures.
+
+    python -m benchmarks.stand_in --port 8900 --latency-ms 30
+
+Point the services at it with http://127.0.0.1:8900/REST (RxNav) and
+http://127.0.0.1:8900/drug/event.json (OpenFDA). Unknown requests get the same
+"nothing found" answers the real APIs give, so every benchmark run is offline and repeatable.
+"""
+import argparse
+import json
+import os
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote_plus, urlsplit
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+
+_PRODUCT = re.compile(r'patient\.drug\.medicinalproduct:"([^"]+)"')
+
+
+def load_fixtures(directory: str = FIXTURES_DIR) -> dict:
+    with open(os.path.join(directory, "rxnav.json"), encoding="utf-8") as f:
+        rxnav = json.load(f)
+    with open(os.path.join(directory, "openfda.json"), encoding="utf-8") as f:
+        openfda = json.load(f)
+    return {"rxnav": rxnav, "openfda": openfda["pairs"]}
+
+
+def openfda_pair_key(query: str) -> str:
+    """Fixture key for an OpenFDA search: the two medicinal product names, lowercased and sorted."""
+    names = sorted(name.lower() for name in _PRODUCT.findall(unquote_plus(query)))
+    return "|".join(names)
+
+
+class StandIn:
+    """Threaded HTTP server answering RxNav/OpenFDA requests from fixtures, with fixed added latency."""
+
+    def __init__(self, fixtures: dict = None, latency_ms: float = 0, port: int = 0):
+        self.fixtures = fixtures or load_fixtures()
+        self.latency = latency_ms / 1000
+        self.requests = 0
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # Keep-alive, like the real APIs
+
+            def do_GET(self):
+                stand_in.requests += 1
+                if stand_in.latency:
+                    time.sleep(stand_in.latency)
+                status, body = stand_in.respond(self.path)
+                payload = json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_port}"
+
+    def start(self) -> "StandIn":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def respond(self, path: str):
+        parts = urlsplit(path)
+        params = {k: v[0] for k, v in parse_qs(parts.query).items()}
+        rxnav = self.fixtures["rxnav"]
+
+        if parts.path == "/REST/approximateTerm.json":
+            term = params.get("term", "").lower()
+            return 200, rxnav["approximateTerm"].get(term, {"approximateGroup": {"inputTerm": term, "maxEntries": "10"}})
+
+        if parts.path == "/REST/drugs.json":
+            name = params.get("name", "").lower()
+            return 200, rxnav["drugs"].get(name, {"drugGroup": {"name": None}})
+
+        match = re.fullmatch(r"/REST/rxcui/([^/]+)/properties\.json", parts.path)
+        if match:
+            return 200, rxnav["properties"].get(match.group(1), {})
+
+        if parts.path == "/drug/event.json":
+            found = self.fixtures["openfda"].get(openfda_pair_key(parts.query))
+            if found is None:
+                return 404, {"error": {"code": "NOT_FOUND", "message": "No matches found!"}}
+            return 200, found
+
+        return 404, {"error": f"Unknown path {parts.path}"}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--latency-ms", type=float, default=30)
+    args = parser.parse_args()
+
+    stand_in = StandIn(latency_ms=args.latency_ms, port=args.port).start()
+    print(f"Serving RxNav/OpenFDA fixtures on {stand_in.url} (+{args.latency_ms}ms per request)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        stand_in.stop()
+
+
+if __name__ == "__main__":
+    main()
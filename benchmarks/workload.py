@@ -0,0 +1,32 @@
+"""Inputs shared by the benchmark runner and the fixture recorder."""
+from backend.services.drug_class_registry import DrugClassRegistry
+
+SEARCH_QUERIES = {
+    "english": ["Warfarin", "Aspirin", "Ibuprofen", "Metformin"],
+    "arabic": ["وارفارين", "بروفين", "اسبرين", "جلوكوفاج"],
+    "misspelled": ["asprin", "ibuprofn", "warfrin", "amoxicilin", "metfromin"],
+}
+
+CHECK_LIST_SIZES = [2, 5, 10, 15, 20, 30]
+CHECK_CONDITIONS = ["pregnancy", "hypertension"]
+
+
+def check_drugs(count: int = max(CHECK_LIST_SIZES)) -> list:
+    """
+    Deterministic medication list mixing drug classes (round-robin over DrugClassRegistry),
+    so larger lists contain both interacting and unrelated pairs.
+    """
+    classes = [list(drugs) for drugs in DrugClassRegistry.CLASSES.values()]
+    picked = []
+    seen = set()
+    while len(picked) < count and any(classes):
+        for drugs in classes:
+            while drugs:
+                drug = drugs.pop(0)
+                if drug["rxcui"] not in seen:
+                    seen.add(drug["rxcui"])
+                    picked.append(drug)
+                    break
+            if len(picked) == count:
+                break
+    return picked
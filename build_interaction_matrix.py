@@ -0,0 +1,17 @@
+from backend.services.interaction_matrix import interaction_matrix
+from backend import database, migrations
+import sys
+
+# Ensure DB created
+migrations.migrate(database.engine)
+
+matrix_path = sys.argv[1] if len(sys.argv) > 1 else interaction_matrix.PATH
+
+print(f"Building interaction matrix into {matrix_path}...")
+db = database.SessionLocal()
+try:
+    stats = interaction_matrix.write(db, matrix_path)
+finally:
+    db.close()
+print(f"Matrix built: {stats['drugs']} drugs, {stats['pairs']} interacting pairs, "
+      f"{stats['descriptions']} distinct descriptions, {stats['bytes']} bytes.")
@@ -1,6 +1,6 @@
-import { useState, useEffect } from 'react';
+import { useState, useEffect, useRef } from 'react';
 import { Drug, Interaction, FoodInteraction, ConditionInteraction } from '@/types';
-import { checkInteractions } from '@/lib/api';
+import { checkInteractions, newCheckSession } from '@/lib/api';
 import { generateReport } from '@/lib/report_generator';
 
 export function useDrugSafety(isRTL: boolean) {
@@ -12,6 +12,8 @@ export function useDrugSafety(isRTL: boolean) {
     const [analyzing, setAnalyzing] = useState(false);
     const [analyzed, setAnalyzed] = useState(false);
     const [error, setError] = useState("");
+    // Check session of the list being edited; a cleared or loaded list starts its own
+    const checkSession = useRef(newCheckSession());
 
     // Load saved drug list on mount
     useEffect(() => {
@@ -57,6 +59,7 @@ export function useDrugSafety(isRTL: boolean) {
 
     const clearAllDrugs = () => {
         setDrugs([]);
+        checkSession.current = newCheckSession();
         resetAnalysis();
         if (typeof window !== 'undefined') {
             localStorage.removeItem('current_drug_list');
@@ -78,6 +81,7 @@ export function useDrugSafety(isRTL: boolean) {
         const savedLists = JSON.parse(localStorage.getItem('saved_drug_lists') || '{}');
         if (savedLists[name]) {
             setDrugs(savedLists[name].drugs);
+            checkSession.current = newCheckSession();
             resetAnalysis();
         }
     };
@@ -104,7 +108,7 @@ export function useDrugSafety(isRTL: boolean) {
             const rxcuis = drugs.map((d) => d.rxcui);
             // Simulated delay for UX
             const [res] = await Promise.all([
-                checkInteractions(rxcuis, selectedConditions),
+                checkInteractions(rxcuis, selectedConditions, checkSession.current),
                 new Promise(r => setTimeout(r, 800))
             ]);
 
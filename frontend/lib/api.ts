@@ -43,16 +43,47 @@ export async function searchDrug(query: string): Promise<SearchResponse> {
     return data;
 }
 
-export async function checkInteractions(rxcuis: string[], conditions: string[] = []): Promise<CheckResponse> {
-    const res = await fetch(`${API_BASE}/check_interactions`, {
-        method: "POST",
-        headers: {
-            "Content-Type": "application/json",
-        },
-        body: JSON.stringify({ rxcuis, conditions }),
-    });
+// Server-side check session for one drug list: re-checks only evaluate pairs involving
+// newly added drugs. Each list keeps its own session, plus the last ETag for revalidation.
+export interface CheckSession {
+    id: string | null;
+    etag: string | null;
+    result: CheckResponse | null;
+}
+
+export function newCheckSession(): CheckSession {
+    return { id: null, etag: null, result: null };
+}
+
+export async function checkInteractions(
+    rxcuis: string[],
+    conditions: string[] = [],
+    session: CheckSession = newCheckSession()
+): Promise<CheckResponse> {
+    const headers: Record<string, string> = { "Content-Type": "application/json" };
+    const body = JSON.stringify({ rxcuis, conditions });
+
+    if (session.id) {
+        if (session.etag && session.result) headers["If-None-Match"] = session.etag;
+        const res = await fetch(`${API_BASE}/check_sessions/${session.id}`, { method: "PUT", headers, body });
+        if (res.status === 304 && session.result) return session.result; // Nothing changed
+        if (res.ok) return remember(session, res);
+        if (res.status !== 404) throw new Error("Failed to check interactions");
+        Object.assign(session, newCheckSession()); // Expired: start a new session
+        delete headers["If-None-Match"];
+    }
+
+    const res = await fetch(`${API_BASE}/check_sessions`, { method: "POST", headers, body });
     if (!res.ok) throw new Error("Failed to check interactions");
-    return res.json();
+    return remember(session, res);
+}
+
+async function remember(session: CheckSession, res: Response): Promise<CheckResponse> {
+    const data: CheckResponse = await res.json();
+    session.id = data.session_id ?? null;
+    session.etag = res.headers.get("ETag");
+    session.result = data;
+    return data;
 }
 
 export async function explainInteraction(drug1: string, drug2: string, severity: string) {
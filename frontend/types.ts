@@ -50,4 +50,5 @@ export interface CheckResponse {
     interactions: Interaction[];
     food_interactions: FoodInteraction[];
     condition_interactions: ConditionInteraction[];
+    session_id?: string;
 }
@@ -1,8 +1,8 @@
 from backend.services.interaction_generator import interaction_generator
 from backend.database import SessionLocal, engine
-from backend import models
+from backend import migrations
 
-models.Base.metadata.create_all(bind=engine)
+migrations.migrate(engine)
 
 db = SessionLocal()
 try:
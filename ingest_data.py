@@ -1,21 +1,34 @@
 from backend.services.ingestion_service import ingestion_service
-from backend import models, database
+from backend import database, migrations
 import os
 
 # Ensure DB created
-models.Base.metadata.create_all(bind=database.engine)
+migrations.migrate(database.engine)
 
 
 # Ingest Interactions
 interactions_path = os.path.join(os.path.dirname(__file__), "data", "interactions.csv")
 if os.path.exists(interactions_path):
     print(f"Ingesting interactions from {interactions_path}...")
-    count = ingestion_service.ingest_csv(interactions_path)
-    print(f"Successfully ingested {count} new interactions.")
+    stats = ingestion_service.ingest_csv_stream(interactions_path)
+    print(f"Successfully ingested {stats['inserted']} new interactions "
+          f"({stats['rows']} rows in {stats['seconds']}s, {stats['rows_per_sec']} rows/sec).")
 
 # Ingest Egyptian Drugs
 egyptian_path = os.path.join(os.path.dirname(__file__), "data", "egyptian_drugs.csv")
 if os.path.exists(egyptian_path):
     print(f"Ingesting Egyptian drugs from {egyptian_path}...")
-    count = ingestion_service.ingest_egyptian_drugs(egyptian_path)
-    print(f"Successfully ingested {count} new Egyptian drugs.")
+    stats = ingestion_service.ingest_egyptian_drugs_stream(egyptian_path)
+    print(f"Successfully ingested {stats['inserted']} new Egyptian drugs "
+          f"({stats['rows']} rows in {stats['seconds']}s, {stats['rows_per_sec']} rows/sec).")
+
+# Ingest Food & Condition Rules (replaces the rule tables)
+for label, file_name, ingest in [
+    ("food rules", "food_interactions.csv", ingestion_service.ingest_food_rules),
+    ("condition rules", "condition_interactions.csv", ingestion_service.ingest_condition_rules),
+]:
+    rules_path = os.path.join(os.path.dirname(__file__), "data", file_name)
+    if os.path.exists(rules_path):
+        print(f"Ingesting {label} from {rules_path}...")
+        stats = ingest(rules_path)
+        print(f"Successfully loaded {stats['inserted']} {label}.")
@@ -0,0 +1,19 @@
+from backend.services.openfda_cache import openfda_cache
+from backend import database, migrations
+import sys
+
+# Ensure DB created
+migrations.migrate(database.engine)
+
+if len(sys.argv) < 2:
+    print("Usage: python load_openfda_snapshot.py <snapshot.json> [--export]")
+    sys.exit(1)
+
+snapshot_path = sys.argv[1]
+if "--export" in sys.argv[2:]:
+    count = openfda_cache.export_snapshot(snapshot_path)
+    print(f"Exported {count} cached OpenFDA pair results to {snapshot_path}.")
+else:
+    print(f"Loading OpenFDA snapshot from {snapshot_path}...")
+    count = openfda_cache.load_snapshot(snapshot_path)
+    print(f"Successfully cached {count} OpenFDA pair results.")
@@ -1,9 +1,9 @@
 from backend.database import SessionLocal, engine
-from backend import models
+from backend import migrations
 from backend.services.interaction_service import interaction_service
 
 # Ensure tables exist
-models.Base.metadata.create_all(bind=engine)
+migrations.migrate(engine)
 
 db = SessionLocal()
 try:
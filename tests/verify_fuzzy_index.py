@@ -0,0 +1,107 @@
+"""
+Deterministic cross-checks of the spelling index against naive versions: bit-parallel
+Levenshtein vs dynamic programming, the BK-tree vs a full scan, and FuzzyIndex.similar
+(prefix / substring tiers plus edit distance) vs a direct scorer, with partial-name
+regression cases for search suggestions and synonym expansion.
+
+    python tests/verify_fuzzy_index.py
+
+Runs offline on a throwaway in-memory database.
+"""
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ["DATABASE_URL"] = "sqlite://"  # Never touch drug_safety.db
+
+from backend import database, migrations
+from backend.services.fuzzy_index import FuzzyIndex, levenshtein
+from backend.services.rxnav_service import rxnav_service
+
+ALPHABET = "abcde" + "ابت"  # Small alphabet: plenty of shared prefixes and near-misses
+
+
+def naive_levenshtein(a: str, b: str) -> int:
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b)))
+        previous = current
+    return previous[-1]
+
+
+def naive_score(query: str, name: str, substrings: bool = True) -> float:
+    score = 1 - naive_levenshtein(query, name) / max(len(query), len(name))
+    if name.startswith(query) or query.startswith(name):
+        score = max(score, FuzzyIndex.PREFIX_SCORE)
+    elif substrings and (query in name or name in query):
+        score = max(score, FuzzyIndex.SUBSTRING_SCORE)
+    return score
+
+
+def random_word(rng: random.Random, max_length: int) -> str:
+    return "".join(rng.choice(ALPHABET) for _ in range(rng.randint(0, max_length)))
+
+
+def test_levenshtein():
+    rng = random.Random(1)
+    for _ in range(3000):
+        # Up to 80 characters: past one 64-bit word in the bit-parallel version
+        a, b = random_word(rng, 80 if rng.random() < 0.2 else 12), random_word(rng, 12)
+        expected = naive_levenshtein(a, b)
+        assert levenshtein(a, b) == expected, (a, b)
+        assert levenshtein(b, a) == expected, (b, a)
+        bound = rng.randint(0, 6)
+        assert levenshtein(a, b, bound) == min(expected, bound + 1), (a, b, bound)
+
+
+def test_bk_tree_search():
+    rng = random.Random(2)
+    vocabulary = sorted({random_word(rng, 9) for _ in range(400)} - {""})
+    index = FuzzyIndex(vocabulary)
+    for _ in range(300):
+        query = random_word(rng, 9) or "a"
+        max_distance = rng.randint(0, 3)
+        expected = sorted(
+            (word, naive_levenshtein(query, word)) for word in vocabulary
+            if naive_levenshtein(query, word) <= max_distance
+        )
+        assert sorted(index.search(query, max_distance)) == expected, (query, max_distance)
+
+
+def test_similar():
+    rng = random.Random(3)
+    vocabulary = sorted({random_word(rng, 10) for _ in range(300)} - {""})
+    index = FuzzyIndex(vocabulary)
+    for _ in range(300):
+        query = random_word(rng, 8) or "a"
+        min_score = rng.choice([0.6, 0.7, 0.8])
+        substrings = rng.random() < 0.7
+        expected = sorted(
+            (word, round(naive_score(query, word, substrings), 3)) for word in vocabulary
+            if naive_score(query, word, substrings) >= min_score
+        )
+        found = sorted((r["name"], r["score"]) for r in index.similar(query, min_score, substrings=substrings))
+        assert found == expected, (query, min_score, substrings)
+
+
+def test_partial_names():
+    migrations.migrate(database.engine)
+    # First keystrokes of a name: prefix tier, as with the SequenceMatcher scorer it replaced
+    assert {"name": "warfarin", "score": 0.9} in rxnav_service._suggest_corrections("warf")
+    assert "paracetamol" in rxnav_service._expand_search_terms("panad")
+    assert "ibuprofen" in rxnav_service._expand_search_terms("advi")
+    # Part of a longer name, and a name inside a longer query
+    assert any(s["name"].lower() == "amoxicillin" for s in rxnav_service._suggest_corrections("moxicil"))
+    assert any(s["name"].lower() == "warfarin" for s in rxnav_service._suggest_corrections("warfarin sodium"))
+    # Typos still go through edit distance
+    assert rxnav_service._suggest_corrections("asprin")[0]["name"].lower() == "aspirin"
+    assert "paracetamol" in rxnav_service._expand_search_terms("panadl")
+
+
+if __name__ == "__main__":
+    for check in (test_levenshtein, test_bk_tree_search, test_similar, test_partial_names):
+        check()
+        print(f"[OK] {check.__name__}")
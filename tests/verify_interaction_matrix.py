@@ -0,0 +1,77 @@
+"""
+Deterministic cross-checks of the packed interaction matrix: the upper-triangle cell
+layout, and every lookup against the in-memory interaction index.
+
+    python tests/verify_interaction_matrix.py
+
+Runs offline on a throwaway in-memory database.
+"""
+import os
+import random
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ["DATABASE_URL"] = "sqlite://"  # Never touch drug_safety.db
+
+from backend import database, migrations
+from backend.models import Interaction
+from backend.services.interaction_index import InteractionIndex
+from backend.services.interaction_matrix import InteractionMatrix, _cell, _triangle_size
+
+
+def test_packed_triangle():
+    for n in range(1, 40):
+        offsets = [_cell(n, i, j) for i in range(n) for j in range(i + 1, n)]
+        # Row-major over the upper triangle: every cell exactly once, no gaps
+        assert offsets == list(range(_triangle_size(n))), n
+        for i in range(n - 1):
+            row = _cell(n, i, i + 1) - (i + 1)  # Shortcut used by lookup_many
+            assert all(row + j == _cell(n, i, j) for j in range(i + 1, n)), (n, i)
+
+
+def test_matrix_matches_index():
+    migrations.migrate(database.engine)
+    rng = random.Random(4)
+    rxcuis = [str(rng.randint(1, 10 ** 6)) for _ in range(60)]
+    rows, seen = [], set()
+    for _ in range(500):
+        d1, d2 = rng.sample(rxcuis, 2)  # Both orientations occur
+        if frozenset((d1, d2)) in seen:
+            continue
+        seen.add(frozenset((d1, d2)))
+        rows.append({"drug_1_rxcui": d1, "drug_2_rxcui": d2,
+                     "severity": rng.choice(["Contraindicated", "Major", "Moderate", "Minor", None]),
+                     "description": rng.choice(["Bleeding risk", "QT prolongation", None]),
+                     "source": rng.choice(["local", "Generated: A+B", None])})
+
+    db = database.SessionLocal()
+    try:
+        db.execute(Interaction.__table__.insert(), rows)
+        db.commit()
+        index, matrix = InteractionIndex(), InteractionMatrix()
+        index.build(db)
+        with tempfile.TemporaryDirectory() as workdir:
+            path = os.path.join(workdir, "matrix.bin")
+            matrix.write(db, path)
+            assert matrix.load(path)
+            assert matrix.is_current(db)
+
+            everyone = rxcuis + ["unknown"]
+            for id1 in everyone:
+                for id2 in everyone:
+                    assert matrix.get(id1, id2) == (index.get(id1, id2) if id1 != id2 else None), (id1, id2)
+                assert sorted(matrix.interactions_for(id1)) == sorted(
+                    index.get(id1, other) for other in index.neighbors(id1)), id1
+            for _ in range(200):
+                subset = rng.sample(everyone, rng.randint(0, 20))
+                assert matrix.lookup_many(subset) == index.lookup_many(subset), subset
+            matrix._file = None  # Unmap before the directory is removed
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    for check in (test_packed_triangle, test_matrix_matches_index):
+        check()
+        print(f"[OK] {check.__name__}")
@@ -0,0 +1,48 @@
+"""
+Deterministic cross-check of the Aho-Corasick keyword matcher against a naive
+whole-word regex scan.
+
+    python tests/verify_keyword_matcher.py
+
+Runs offline; no database needed.
+"""
+import os
+import random
+import re
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.services.keyword_matcher import KeywordMatcher
+
+ALPHABET = "abcde" + "ابت"  # Small alphabet: plenty of overlapping and nested keywords
+
+
+def random_word(rng: random.Random, max_length: int) -> str:
+    return "".join(rng.choice(ALPHABET) for _ in range(rng.randint(0, max_length)))
+
+
+def naive_keyword_matches(keywords: list, text: str) -> list:
+    text = text.lower()
+    found = []
+    for keyword in keywords:
+        for match in re.finditer(f"(?=({re.escape(keyword)}))", text):
+            start, end = match.start(), match.start() + len(keyword)
+            if (start == 0 or not text[start - 1].isalnum()) and (end == len(text) or not text[end].isalnum()):
+                found.append(keyword)
+    return sorted(found)
+
+
+def test_keyword_matcher():
+    rng = random.Random(3)
+    for _ in range(300):
+        keywords = sorted({random_word(rng, 4) for _ in range(rng.randint(1, 12))} - {""})
+        matcher = KeywordMatcher((keyword, keyword) for keyword in keywords)
+        words = [rng.choice(keywords + [random_word(rng, 6)]) for _ in range(rng.randint(0, 12))]
+        text = "".join(word + rng.choice([" ", ", ", "-", "", "x"]) for word in words).upper()
+        assert sorted(keyword for keyword, _ in matcher.find(text)) == naive_keyword_matches(keywords, text), text
+
+
+if __name__ == "__main__":
+    test_keyword_matcher()
+    print("[OK] test_keyword_matcher")